@@ -23,7 +23,13 @@ Simple Factory <- Uma espécie de Factory Method parametrizado
 Simple Factory pode não ser considerado um padrão de projeto por si só
 Simple Factory pode quebrar princípios do SOLID
 """
+import sys
 from abc import ABC, abstractmethod
+from pathlib import Path
+
+# LoteMixin é compartilhado pelas pastas das factories (ver ../lote.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from lote import LoteMixin  # noqa: E402
 
 
 class Veiculo(ABC):
@@ -51,7 +57,7 @@ class MotoPopular(Veiculo):
         print('Moto popular está buscando o cliente...')
 
 
-class VeiculoFactory:
+class VeiculoFactory(LoteMixin):
     @staticmethod
     def get_carro(tipo: str) -> Veiculo:
         if tipo == 'luxo':
@@ -72,3 +78,7 @@ if __name__ == "__main__":
     for i in range(10):
         carro = VeiculoFactory.get_carro(choice(carros_disponiveis))
         carro.buscar_cliente()
+
+    print()
+    for carro in VeiculoFactory.get_carros(['luxo', 'moto', 'luxo']):
+        carro.buscar_cliente()
@@ -25,6 +25,8 @@ Simple Factory pode quebrar princípios do SOLID
 """
 from abc import ABC, abstractmethod
 
+from simple_factory_1 import LoteMixin
+
 
 class Veiculo(ABC):
     @abstractmethod
@@ -51,7 +53,7 @@ class MotoPopular(Veiculo):
         print('Moto popular está buscando o cliente...')
 
 
-class VeiculoFactory:
+class VeiculoFactory(LoteMixin):
     def __init__(self, tipo) -> None:
         self.carro = self.get_carro(tipo)
 
@@ -78,3 +80,7 @@ if __name__ == "__main__":
     for i in range(10):
         carro = VeiculoFactory(choice(carros_disponiveis))
         carro.buscar_cliente()
+
+    print()
+    for carro in VeiculoFactory.get_carros(['luxo', 'moto', 'luxo']):
+        carro.buscar_cliente()
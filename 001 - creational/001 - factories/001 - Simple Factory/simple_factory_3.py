@@ -0,0 +1,224 @@
+"""
+Simple Factory com registro de tipos e carregamento preguiçoso.
+
+Em simple_factory_1.py e simple_factory_2.py o get_carro é uma cadeia
+linear de "if tipo == ...": cada tipo novo exige alterar a factory (quebra
+o princípio do aberto/fechado) e o custo cresce com o número de tipos.
+Além disso, todas as classes de veículo precisam ser importadas antes.
+
+Aqui a factory tem um registro (dicionário) de tipo -> construtor, então
+o despacho é uma consulta em O(1). Os tipos podem ser registrados:
+    - Com o decorator @VeiculoFactory.register('tipo')
+    - Em modo preguiçoso, por 'modulo:Classe' ou por entry points
+      (grupo "veiculos" nos metadados de pacotes instalados). O módulo só
+      é importado na primeira vez que aquele tipo é pedido.
+
+A carga preguiçosa é feita sob uma trava: duas threads pedindo o mesmo
+tipo importam o módulo uma vez só, e se a carga falhar o tipo continua
+registrado para uma nova tentativa.
+"""
+import threading
+from abc import ABC, abstractmethod
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Callable, Dict
+
+from simple_factory_1 import LoteMixin
+
+
+class Veiculo(ABC):
+    @abstractmethod
+    def buscar_cliente(self) -> None: pass
+
+
+class VeiculoFactory(LoteMixin):
+    _registry: Dict[str, Callable[[], Veiculo]] = {}
+    _lazy: Dict[str, Callable[[], Callable[[], Veiculo]]] = {}
+    # RLock: o módulo carregado pode pedir outro tipo preguiçoso
+    _lazy_lock = threading.RLock()
+
+    @classmethod
+    def register(cls, tipo: str):
+        def decorator(class_):
+            cls._registry[tipo] = class_
+            return class_
+
+        return decorator
+
+    @classmethod
+    def register_lazy(cls, tipo: str, target: str) -> None:
+        """ target no formato 'pacote.modulo:Classe' """
+        def load():
+            module_name, _, attr = target.partition(':')
+            return getattr(import_module(module_name), attr)
+
+        cls._lazy[tipo] = load
+
+    @classmethod
+    def load_entry_points(cls, group: str = 'veiculos') -> int:
+        """ Registra os entry points do grupo sem importar nada """
+        found = entry_points(group=group)
+        for entry_point in found:
+            cls._lazy[entry_point.name] = entry_point.load
+        return len(found)
+
+    @classmethod
+    def _resolve(cls, tipo: str) -> Callable[[], Veiculo]:
+        construtor = cls._registry.get(tipo)
+        if construtor is not None:
+            return construtor
+
+        with cls._lazy_lock:
+            # Outra thread pode ter carregado enquanto esperávamos
+            construtor = cls._registry.get(tipo)
+            if construtor is not None:
+                return construtor
+            load = cls._lazy.get(tipo)
+            assert load is not None, 'Veículo não existe'
+            construtor = cls._registry[tipo] = load()
+            del cls._lazy[tipo]
+            return construtor
+
+    @classmethod
+    def get_carro(cls, tipo: str) -> Veiculo:
+        # Fora de qualquer try: um KeyError de dentro do construtor não
+        # pode ser confundido com um tipo não registrado
+        construtor = cls._registry.get(tipo) or cls._resolve(tipo)
+        return construtor()
+
+    @classmethod
+    def _construtor(cls, tipo: str) -> Callable[[], Veiculo]:
+        return cls._resolve(tipo)
+
+
+@VeiculoFactory.register('luxo')
+class CarroLuxo(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Carro de luxo está buscando o cliente...')
+
+
+@VeiculoFactory.register('popular')
+class CarroPopular(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Carro popular está buscando o cliente...')
+
+
+@VeiculoFactory.register('moto_luxo')
+class MotoLuxo(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Moto está buscando o cliente...')
+
+
+@VeiculoFactory.register('moto')
+class MotoPopular(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Moto popular está buscando o cliente...')
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import sys
+    import tempfile
+    import time
+
+    N_KINDS = 500
+    N_USED = 5
+    N_DISPATCHES = 200_000
+
+    carros_disponiveis = ['luxo', 'popular', 'moto']
+    for i in range(10):
+        carro = VeiculoFactory.get_carro(random.choice(carros_disponiveis))
+        carro.buscar_cliente()
+    print()
+
+    def write(path: str, content: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(content)
+
+    def make_plugins(root: str, package: str) -> None:
+        """ Um módulo por tipo de veículo, como plugins de terceiros """
+        write(os.path.join(root, package, '__init__.py'), '')
+        for i in range(N_KINDS):
+            write(
+                os.path.join(root, package, f'veiculo_{i}.py'),
+                'class Veiculo%d:\n'
+                '    def buscar_cliente(self):\n'
+                '        return %d\n' % (i, i)
+            )
+
+    def make_if_chain(root: str) -> None:
+        """ Factory no estilo de simple_factory_1.py, com 500 tipos """
+        lines = [
+            f'from frota_if.veiculo_{i} import Veiculo{i}\n'
+            for i in range(N_KINDS)
+        ]
+        lines.append('\n\ndef get_carro(tipo):\n')
+        lines.extend(
+            f"    if tipo == 'tipo_{i}':\n        return Veiculo{i}()\n"
+            for i in range(N_KINDS)
+        )
+        lines.append("    assert 0, 'Veículo não existe'\n")
+        write(os.path.join(root, 'if_chain_factory.py'), ''.join(lines))
+
+    def make_entry_points(root: str) -> None:
+        dist_info = os.path.join(root, 'frota_plugins-1.0.dist-info')
+        write(os.path.join(dist_info, 'METADATA'),
+              'Metadata-Version: 2.1\nName: frota-plugins\nVersion: 1.0\n')
+        write(
+            os.path.join(dist_info, 'entry_points.txt'),
+            '[veiculos]\n' + ''.join(
+                f'tipo_{i} = frota_plugins.veiculo_{i}:Veiculo{i}\n'
+                for i in range(N_KINDS)
+            )
+        )
+
+    def dispatch_time(get_carro: Callable, kinds) -> float:
+        start = time.perf_counter()
+        for tipo in kinds:
+            get_carro(tipo)
+        return (time.perf_counter() - start) / len(kinds) * 1e9
+
+    with tempfile.TemporaryDirectory() as root:
+        make_plugins(root, 'frota_if')
+        make_plugins(root, 'frota_plugins')
+        make_if_chain(root)
+        make_entry_points(root)
+        sys.path.insert(0, root)
+        sys.dont_write_bytecode = True
+
+        used = [f'tipo_{i}' for i in random.sample(range(N_KINDS), N_USED)]
+
+        start = time.perf_counter()
+        import if_chain_factory
+        for tipo in used:
+            if_chain_factory.get_carro(tipo)
+        if_chain_import = time.perf_counter() - start
+
+        start = time.perf_counter()
+        registered = VeiculoFactory.load_entry_points()
+        for tipo in used:
+            VeiculoFactory.get_carro(tipo)
+        registry_import = time.perf_counter() - start
+        registry_modules = sum(name.startswith('frota_plugins.')
+                               for name in sys.modules)
+
+        print(f'{registered} tipos registrados, {N_USED} usados')
+        print(f'{"":<14}{"import + 1º uso (ms)":>22}'
+              f'{"despacho (ns)":>16}{"módulos":>10}')
+
+        # Despacho com todos os tipos já carregados
+        kinds = [f'tipo_{i}' for i in range(N_KINDS)]
+        for tipo in kinds:
+            VeiculoFactory.get_carro(tipo)
+        sample = random.choices(kinds, k=N_DISPATCHES)
+
+        modules = sum(name.startswith('frota_if.') for name in sys.modules)
+        elapsed = dispatch_time(if_chain_factory.get_carro, sample)
+        print(f'{"cadeia de if":<14}{if_chain_import * 1000:>22.1f}'
+              f'{elapsed:>16.0f}{modules:>10}')
+
+        elapsed = dispatch_time(VeiculoFactory.get_carro, sample)
+        print(f'{"registro":<14}{registry_import * 1000:>22.1f}'
+              f'{elapsed:>16.0f}{registry_modules:>10}')
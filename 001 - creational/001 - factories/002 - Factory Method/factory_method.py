@@ -4,7 +4,13 @@ criar objetos, mas deixa as subclasses decidirem quais objetos criar. O
 Factory method permite adiar a instanciação para as subclasses, garantindo o
 baixo acoplamento entre classes.
 """
+import sys
 from abc import ABC, abstractmethod
+from pathlib import Path
+
+# LoteMixin é compartilhado pelas pastas das factories (ver ../lote.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from lote import LoteMixin  # noqa: E402
 
 
 class Veiculo(ABC):
@@ -32,7 +38,7 @@ class MotoPopular(Veiculo):
         print('Moto popular está buscando o cliente...')
 
 
-class VeiculoFactory(ABC):
+class VeiculoFactory(LoteMixin, ABC):
     def __init__(self, tipo) -> None:
         self.carro = self.get_carro(tipo)
 
@@ -84,3 +90,39 @@ if __name__ == "__main__":
         carro2 = ZonaSulVeiculoFactory(
             choice(veiculos_disponiveis_zona_sul))
         carro2.buscar_cliente()
+
+    print()
+
+    print('ZONA NORTE - EM LOTE')
+    tipos = [choice(veiculos_disponiveis_zona_norte) for i in range(10)]
+    for carro in ZonaNorteVeiculoFactory.get_carros(tipos):
+        carro.buscar_cliente()
+
+    import time
+    from collections import deque
+
+    N_CARROS = 1_000_000
+    tipos = [choice(veiculos_disponiveis_zona_norte) for i in range(N_CARROS)]
+
+    def por_item():
+        return [ZonaNorteVeiculoFactory.get_carro(tipo) for tipo in tipos]
+
+    def em_lote():
+        return ZonaNorteVeiculoFactory.get_carros(tipos)
+
+    def em_lote_agrupado():
+        return ZonaNorteVeiculoFactory.get_carros(tipos, agrupados=True)
+
+    def streaming():
+        deque(ZonaNorteVeiculoFactory.iter_carros(iter(tipos)), maxlen=0)
+
+    print()
+    print(f'{N_CARROS:,} veículos')
+    print(f'{"modo":<28}{"s":>8}')
+    for name, func in [('loop com get_carro', por_item),
+                       ('get_carros', em_lote),
+                       ('get_carros(agrupados=True)', em_lote_agrupado),
+                       ('iter_carros (streaming)', streaming)]:
+        start = time.perf_counter()
+        func()
+        print(f'{name:<28}{time.perf_counter() - start:>8.2f}')
@@ -0,0 +1,252 @@
+"""
+Pool de objetos sobre o Factory Method.
+
+Em simple_factory_2.py e factory_method.py cada pedido de corrida cria um
+novo veículo e um novo objeto factory (VeiculoFactory(tipo)). Com milhões
+de pedidos por minuto, isso é muita alocação e muito trabalho para o GC.
+
+O PooledVeiculoFactory usa a factory concreta (composição) só quando
+precisa de um veículo novo. Veículos devolvidos com release são
+reiniciados (método reset, se existir) e reaproveitados:
+    - acquire(tipo) pega um veículo livre daquele tipo (hit) ou cria um
+      novo (miss). Se o limite de veículos do tipo foi atingido, espera
+      (wait) até algum ser devolvido.
+    - release(veiculo) devolve o veículo ao pool. Devolver duas vezes, ou
+      devolver um veículo que não saiu deste pool, gera ValueError.
+    - "with pool.veiculo(tipo) as carro:" faz as duas coisas.
+    - stats tem os contadores de hit, miss e wait.
+"""
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from threading import Condition, Lock
+from typing import Dict, List, Optional, Type
+
+
+class Veiculo(ABC):
+    def __init__(self) -> None:
+        self.cliente: Optional[str] = None
+
+    @abstractmethod
+    def buscar_cliente(self) -> None: pass
+
+    def reset(self) -> None:
+        self.cliente = None
+
+
+class CarroLuxo(Veiculo):
+    def buscar_cliente(self) -> None:
+        print(f'Carro de luxo está buscando {self.cliente}...')
+
+
+class CarroPopular(Veiculo):
+    def buscar_cliente(self) -> None:
+        print(f'Carro popular está buscando {self.cliente}...')
+
+
+class MotoLuxo(Veiculo):
+    def buscar_cliente(self) -> None:
+        print(f'Moto de luxo está buscando {self.cliente}...')
+
+
+class MotoPopular(Veiculo):
+    def buscar_cliente(self) -> None:
+        print(f'Moto popular está buscando {self.cliente}...')
+
+
+class VeiculoFactory(ABC):
+    def __init__(self, tipo) -> None:
+        self.carro = self.get_carro(tipo)
+
+    @staticmethod
+    @abstractmethod
+    def get_carro(tipo: str) -> Veiculo: pass
+
+    def buscar_cliente(self) -> None:
+        self.carro.buscar_cliente()
+
+
+class ZonaNorteVeiculoFactory(VeiculoFactory):
+    @staticmethod
+    def get_carro(tipo: str) -> Veiculo:
+        if tipo == 'luxo':
+            return CarroLuxo()
+        if tipo == 'popular':
+            return CarroPopular()
+        if tipo == 'moto':
+            return MotoPopular()
+        if tipo == 'moto_luxo':
+            return MotoLuxo()
+        assert 0, 'Veículo não existe'
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+
+
+class PooledVeiculoFactory:
+    def __init__(self, factory: Type[VeiculoFactory],
+                 max_per_kind: int = 100) -> None:
+        self._factory = factory
+        self._max_per_kind = max_per_kind
+        self._free: Dict[str, List[Veiculo]] = {}
+        self._created: Dict[str, int] = {}
+        # id -> veículo emprestado; a referência impede o id de ser reusado
+        self._in_use: Dict[int, Veiculo] = {}
+        # "with self._lock" é mais barato que "with self._condition";
+        # a condition usa a mesma trava e só aparece quando é preciso esperar
+        self._lock = Lock()
+        self._condition = Condition(self._lock)
+        self._waiting = 0
+        self.stats = PoolStats()
+
+    def acquire(self, tipo: str, timeout: Optional[float] = None) -> Veiculo:
+        with self._lock:
+            free = self._free.setdefault(tipo, [])
+            if free:
+                self.stats.hits += 1
+                veiculo = free.pop()
+            elif self._created.get(tipo, 0) < self._max_per_kind:
+                self.stats.misses += 1
+                veiculo = self._factory.get_carro(tipo)
+                # Guarda o tipo no próprio veículo para o release
+                veiculo.tipo_pool = tipo
+                self._created[tipo] = self._created.get(tipo, 0) + 1
+            else:
+                self.stats.waits += 1
+                start = time.perf_counter()
+                self._waiting += 1
+                try:
+                    if not self._condition.wait_for(lambda: free, timeout):
+                        raise TimeoutError(
+                            f'Nenhum veículo {tipo} disponível'
+                        )
+                finally:
+                    self._waiting -= 1
+                self.stats.wait_time += time.perf_counter() - start
+                veiculo = free.pop()
+
+            self._in_use[id(veiculo)] = veiculo
+            return veiculo
+
+    def release(self, veiculo: Veiculo) -> None:
+        with self._lock:
+            if self._in_use.pop(id(veiculo), None) is not veiculo:
+                raise ValueError(
+                    'Veículo não está emprestado por este pool'
+                )
+        reset = getattr(veiculo, 'reset', None)
+        if reset is not None:
+            reset()
+        with self._lock:
+            self._free[veiculo.tipo_pool].append(veiculo)
+            if self._waiting:
+                # Acorda todos: quem espera pode querer outro tipo
+                self._condition.notify_all()
+
+    @contextmanager
+    def veiculo(self, tipo: str, timeout: Optional[float] = None):
+        veiculo = self.acquire(tipo, timeout)
+        try:
+            yield veiculo
+        finally:
+            self.release(veiculo)
+
+
+if __name__ == "__main__":
+    import gc
+    from collections import deque
+    from random import choice
+    from threading import Thread
+
+    N_DISPATCHES = 1_000_000
+    veiculos_disponiveis_zona_norte = ['luxo', 'popular', 'moto', 'moto_luxo']
+
+    pool = PooledVeiculoFactory(ZonaNorteVeiculoFactory, max_per_kind=2)
+    for cliente in ['Ana', 'Bruno', 'Carla']:
+        with pool.veiculo(choice(veiculos_disponiveis_zona_norte)) as carro:
+            carro.cliente = cliente
+            carro.buscar_cliente()
+    print(pool.stats)
+    try:
+        pool.release(carro)
+    except ValueError as error:
+        print('ValueError:', error)
+    print()
+
+    def gc_collections() -> int:
+        return sum(generation['collections'] for generation in gc.get_stats())
+
+    # Pedidos em andamento: os veículos ficam vivos por um tempo, como numa
+    # corrida de verdade, em vez de serem liberados imediatamente
+    IN_FLIGHT = 1000
+
+    tipos = [choice(veiculos_disponiveis_zona_norte)
+             for _ in range(N_DISPATCHES)]
+
+    def sem_pool() -> int:
+        em_andamento = deque(maxlen=IN_FLIGHT)
+        for tipo in tipos:
+            carro = ZonaNorteVeiculoFactory(tipo)
+            carro.carro.cliente = 'cliente'
+            em_andamento.append(carro)
+        # Um objeto factory e um veículo por pedido
+        return 2 * len(tipos)
+
+    def com_pool() -> int:
+        pool = PooledVeiculoFactory(ZonaNorteVeiculoFactory,
+                                    max_per_kind=IN_FLIGHT)
+        acquire, release = pool.acquire, pool.release
+        em_andamento = deque()
+        for tipo in tipos:
+            carro = acquire(tipo)
+            carro.cliente = 'cliente'
+            em_andamento.append(carro)
+            if len(em_andamento) == IN_FLIGHT:
+                release(em_andamento.popleft())
+        print(f'  {pool.stats}')
+        return pool.stats.misses
+
+    def com_pool_contexto() -> int:
+        pool = PooledVeiculoFactory(ZonaNorteVeiculoFactory)
+        for tipo in tipos:
+            with pool.veiculo(tipo) as carro:
+                carro.cliente = 'cliente'
+        return pool.stats.misses
+
+    def com_pool_threads() -> int:
+        pool = PooledVeiculoFactory(ZonaNorteVeiculoFactory, max_per_kind=2)
+        n_threads = 8
+
+        def worker(part) -> None:
+            for tipo in part:
+                with pool.veiculo(tipo) as carro:
+                    carro.cliente = 'cliente'
+
+        threads = [Thread(target=worker, args=(tipos[i::n_threads],))
+                   for i in range(n_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f'  {pool.stats}')
+        return pool.stats.misses
+
+    print(f'{N_DISPATCHES:,} despachos')
+    print(f'{"modo":<32}{"s":>8}{"objetos criados":>18}'
+          f'{"coletas do GC":>16}')
+    for name, func in [('sem pool (factory por pedido)', sem_pool),
+                       ('pool: acquire/release', com_pool),
+                       ('pool: with pool.veiculo()', com_pool_contexto),
+                       ('pool: 8 threads, 2 por tipo', com_pool_threads)]:
+        before = gc_collections()
+        start = time.perf_counter()
+        created = func()
+        elapsed = time.perf_counter() - start
+        print(f'{name:<32}{elapsed:>8.2f}{created:>18,}'
+              f'{gc_collections() - before:>16}')
@@ -0,0 +1,218 @@
+"""
+Factory Method com instâncias compartilhadas para produtos sem estado.
+
+Em factory_method.py, CarroLuxo, CarroPopular, MotoLuxo e MotoPopular não
+guardam nada na instância, mas cada get_carro cria um objeto novo.
+
+Aqui a factory concreta pode declarar, em produtos_sem_estado, quais
+tipos não têm estado. Para esses tipos o get_carro passa a devolver sempre
+a mesma instância (criada na primeira chamada). Isso é opt-in: factories
+que não declaram nada continuam criando um objeto por chamada.
+
+Para falhar cedo se um produto tiver estado:
+    - Se a instância já tiver atributos quando é criada, TypeError.
+    - A instância compartilhada é "congelada" (muda para uma subclasse que
+      proíbe setattr/delattr), então quem tentar alterá-la recebe
+      TypeError em vez de alterar o veículo de todo mundo.
+"""
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, FrozenSet
+
+
+class Veiculo(ABC):
+    @abstractmethod
+    def buscar_cliente(self) -> None: pass
+
+
+class CarroLuxo(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Carro de luxo está buscando o cliente...')
+
+
+class CarroPopular(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Carro popular está buscando o cliente...')
+
+
+class MotoLuxo(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Moto de luxo está buscando o cliente...')
+
+
+class MotoPopular(Veiculo):
+    def buscar_cliente(self) -> None:
+        print('Moto popular está buscando o cliente...')
+
+
+def _imutavel(self, *args) -> None:
+    raise TypeError(
+        f'{type(self).__name__} é compartilhado e não pode ser alterado'
+    )
+
+
+_congeladas: Dict[type, type] = {}
+
+
+def congelar(veiculo: Veiculo) -> Veiculo:
+    if getattr(veiculo, '__dict__', None):
+        raise TypeError(
+            f'{type(veiculo).__name__} tem estado e não pode ser '
+            'compartilhado'
+        )
+
+    classe = type(veiculo)
+    congelada = _congeladas.get(classe)
+    if congelada is None:
+        congelada = type(classe.__name__, (classe,), {
+            '__slots__': (),
+            '__setattr__': _imutavel,
+            '__delattr__': _imutavel,
+        })
+        _congeladas[classe] = congelada
+    veiculo.__class__ = congelada
+    return veiculo
+
+
+def _compartilhar(get_carro: Callable[[str], Veiculo],
+                  sem_estado: FrozenSet[str]) -> Callable[[str], Veiculo]:
+    cache: Dict[str, Veiculo] = {}
+
+    def get_carro_compartilhado(tipo: str) -> Veiculo:
+        carro = cache.get(tipo)
+        if carro is not None:
+            return carro
+        carro = get_carro(tipo)
+        if tipo in sem_estado:
+            carro = cache[tipo] = congelar(carro)
+        return carro
+
+    return get_carro_compartilhado
+
+
+class VeiculoFactory(ABC):
+    # Tipos cujos produtos não têm estado e podem ser compartilhados
+    produtos_sem_estado: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.produtos_sem_estado and 'get_carro' in vars(cls):
+            cls.get_carro = staticmethod(_compartilhar(
+                vars(cls)['get_carro'].__func__,
+                frozenset(cls.produtos_sem_estado),
+            ))
+
+    def __init__(self, tipo) -> None:
+        self.carro = self.get_carro(tipo)
+
+    @staticmethod
+    @abstractmethod
+    def get_carro(tipo: str) -> Veiculo: pass
+
+    def buscar_cliente(self) -> None:
+        self.carro.buscar_cliente()
+
+
+class ZonaNorteVeiculoFactory(VeiculoFactory):
+    produtos_sem_estado = frozenset({'luxo', 'popular', 'moto', 'moto_luxo'})
+
+    @staticmethod
+    def get_carro(tipo: str) -> Veiculo:
+        if tipo == 'luxo':
+            return CarroLuxo()
+        if tipo == 'popular':
+            return CarroPopular()
+        if tipo == 'moto':
+            return MotoPopular()
+        if tipo == 'moto_luxo':
+            return MotoLuxo()
+        assert 0, 'Veículo não existe'
+
+
+class ZonaSulVeiculoFactory(VeiculoFactory):
+    @staticmethod
+    def get_carro(tipo: str) -> Veiculo:
+        if tipo == 'popular':
+            return CarroPopular()
+        assert 0, 'Veículo não existe'
+
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+    from random import choice
+
+    N_CHAMADAS = 10_000_000
+    N_GUARDADOS = 1_000_000
+    veiculos_disponiveis_zona_norte = ['luxo', 'popular', 'moto', 'moto_luxo']
+
+    carro1 = ZonaNorteVeiculoFactory.get_carro('luxo')
+    carro2 = ZonaNorteVeiculoFactory.get_carro('luxo')
+    carro1.buscar_cliente()
+    print(carro1 is carro2, isinstance(carro1, CarroLuxo))
+    print(ZonaSulVeiculoFactory.get_carro('popular') is
+          ZonaSulVeiculoFactory.get_carro('popular'))
+
+    try:
+        carro1.cliente = 'Ana'
+    except TypeError as error:
+        print('TypeError:', error)
+
+    class CarroComEstado(Veiculo):
+        def __init__(self) -> None:
+            self.cliente = None
+
+        def buscar_cliente(self) -> None:
+            print('Carro com estado está buscando o cliente...')
+
+    class FactoryErrada(VeiculoFactory):
+        produtos_sem_estado = frozenset({'estado'})
+
+        @staticmethod
+        def get_carro(tipo: str) -> Veiculo:
+            return CarroComEstado()
+
+    try:
+        FactoryErrada.get_carro('estado')
+    except TypeError as error:
+        print('TypeError:', error)
+    print()
+
+    tipos = [choice(veiculos_disponiveis_zona_norte) for _ in range(1000)]
+
+    def medir(get_carro: Callable[[str], Veiculo]):
+        start = time.perf_counter()
+        for _ in range(N_CHAMADAS // len(tipos)):
+            for tipo in tipos:
+                get_carro(tipo)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        guardados = [get_carro(tipos[i % len(tipos)])
+                     for i in range(N_GUARDADOS)]
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Os veículos guardados continuam válidos (e vivos até aqui)
+        assert all(isinstance(carro, Veiculo) for carro in guardados)
+        return elapsed, pico
+
+    def sem_compartilhar(tipo: str) -> Veiculo:
+        # O mesmo if de ZonaNorteVeiculoFactory, sem o cache
+        if tipo == 'luxo':
+            return CarroLuxo()
+        if tipo == 'popular':
+            return CarroPopular()
+        if tipo == 'moto':
+            return MotoPopular()
+        if tipo == 'moto_luxo':
+            return MotoLuxo()
+        assert 0, 'Veículo não existe'
+
+    print(f'{N_CHAMADAS:,} chamadas; memória com '
+          f'{N_GUARDADOS:,} veículos guardados')
+    print(f'{"modo":<18}{"s":>8}{"chamadas/s":>16}{"memória (MB)":>16}')
+    for nome, get_carro in [('um por chamada', sem_compartilhar),
+                            ('compartilhado',
+                             ZonaNorteVeiculoFactory.get_carro)]:
+        elapsed, pico = medir(get_carro)
+        print(f'{nome:<18}{elapsed:>8.2f}{N_CHAMADAS / elapsed:>16,.0f}'
+              f'{pico / 2 ** 20:>16.1f}')
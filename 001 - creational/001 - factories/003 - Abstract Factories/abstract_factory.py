@@ -9,7 +9,14 @@ Factory Method usa herança, enquanto Abstract Factory usa a composição.
 
 Princípio: programe para interfaces, não para implementações
 """
+import sys
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable
+
+# LoteMixin é compartilhado pelas pastas das factories (ver ../lote.py)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from lote import LoteMixin  # noqa: E402
 
 
 class VeiculoLuxo(ABC):
@@ -62,7 +69,7 @@ class MotoPopularZS(VeiculoPopular):
         print('Moto popular ZS está buscando o cliente...')
 
 
-class VeiculoFactory(ABC):
+class VeiculoFactory(LoteMixin, ABC):
     @staticmethod
     @abstractmethod
     def get_carro_luxo() -> VeiculoLuxo: pass
@@ -79,6 +86,19 @@ class VeiculoFactory(ABC):
     @abstractmethod
     def get_moto_popular() -> VeiculoPopular: pass
 
+    @classmethod
+    def _construtor(cls, tipo: str) -> Callable:
+        # Só os métodos de produto da família; 'carros' (get_carros) não
+        if tipo not in PRODUTOS:
+            raise ValueError(f'Veículo não existe: {tipo!r}')
+        return getattr(cls, f'get_{tipo}')
+
+
+# Nomes dos métodos de produto sem o "get_" ('carro_luxo', ...)
+PRODUTOS = frozenset(
+    name[len('get_'):] for name in VeiculoFactory.__abstractmethods__
+)
+
 
 class ZonaNorteVeiculoFactory(VeiculoFactory):
     @staticmethod
@@ -135,3 +155,31 @@ class Cliente:
 if __name__ == "__main__":
     cliente = Cliente()
     cliente.buscar_clientes()
+
+    print()
+    tipos = ['moto_luxo', 'carro_popular']
+    for carro in ZonaSulVeiculoFactory.get_carros(tipos):
+        carro.buscar_cliente()
+
+    import time
+    from random import choice
+
+    N_CARROS = 1_000_000
+    disponiveis = ['carro_luxo', 'carro_popular', 'moto_luxo', 'moto_popular']
+    tipos = [choice(disponiveis) for i in range(N_CARROS)]
+
+    def por_item():
+        factory = ZonaNorteVeiculoFactory()
+        return [getattr(factory, f'get_{tipo}')() for tipo in tipos]
+
+    def em_lote():
+        return ZonaNorteVeiculoFactory.get_carros(tipos)
+
+    print()
+    print(f'{N_CARROS:,} veículos')
+    print(f'{"modo":<28}{"s":>8}')
+    for name, func in [('loop com get_<tipo>()', por_item),
+                       ('get_carros', em_lote)]:
+        start = time.perf_counter()
+        func()
+        print(f'{name:<28}{time.perf_counter() - start:>8.2f}')
@@ -0,0 +1,394 @@
+"""
+Despachante de corridas dividido por zona, sobre o Abstract Factory.
+
+Em abstract_factory.py o Cliente.buscar_clientes passa pelas factories
+de zona uma depois da outra e chama buscar_cliente em série. Um pico de
+pedidos numa zona atrasa todas as outras.
+
+Aqui cada zona tem um shard: uma fila limitada (asyncio.Queue) e uma
+task própria que atende os pedidos daquela zona usando a factory
+(família de veículos) da zona:
+    - submit espera quando a fila da zona está cheia (backpressure), e
+      try_submit recusa o pedido na hora em vez de esperar.
+    - Cada shard mede a latência de cada pedido (da entrada na fila até
+      o atendimento) e metricas() devolve p50/p99 por zona e no total.
+      As latências ficam numa amostra de tamanho fixo (reservoir
+      sampling), para a memória não crescer com o tempo de execução; no
+      total, a amostra de cada zona pesa o número de pedidos que ela
+      atendeu, e não o tamanho da amostra.
+    - Um pedido que falha ao ser atendido é contado em "falhas" e não
+      derruba a task da zona.
+
+O despachante não é mais rápido: no demo, em que atender um pedido não
+faz I/O, ele atende de 4 a 10 vezes menos corridas por segundo que o laço
+serial, porque as filas e o event loop custam mais que o atendimento. O
+ganho é o isolamento entre as zonas e a memória limitada pelas filas, o
+que compensa quando o atendimento espera por I/O.
+"""
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+class VeiculoLuxo(ABC):
+    @abstractmethod
+    def buscar_cliente(self) -> str: pass
+
+
+class VeiculoPopular(ABC):
+    @abstractmethod
+    def buscar_cliente(self) -> str: pass
+
+
+class CarroLuxoZN(VeiculoLuxo):
+    def buscar_cliente(self) -> str:
+        return 'Carro de luxo ZN está buscando o cliente...'
+
+
+class CarroPopularZN(VeiculoPopular):
+    def buscar_cliente(self) -> str:
+        return 'Carro popular ZN está buscando o cliente...'
+
+
+class MotoLuxoZN(VeiculoLuxo):
+    def buscar_cliente(self) -> str:
+        return 'Moto de luxo ZN está buscando o cliente...'
+
+
+class MotoPopularZN(VeiculoPopular):
+    def buscar_cliente(self) -> str:
+        return 'Moto popular ZN está buscando o cliente...'
+
+
+class CarroLuxoZS(VeiculoLuxo):
+    def buscar_cliente(self) -> str:
+        return 'Carro de luxo ZS está buscando o cliente...'
+
+
+class CarroPopularZS(VeiculoPopular):
+    def buscar_cliente(self) -> str:
+        return 'Carro popular ZS está buscando o cliente...'
+
+
+class MotoLuxoZS(VeiculoLuxo):
+    def buscar_cliente(self) -> str:
+        return 'Moto de luxo ZS está buscando o cliente...'
+
+
+class MotoPopularZS(VeiculoPopular):
+    def buscar_cliente(self) -> str:
+        return 'Moto popular ZS está buscando o cliente...'
+
+
+class VeiculoFactory(ABC):
+    @staticmethod
+    @abstractmethod
+    def get_carro_luxo() -> VeiculoLuxo: pass
+
+    @staticmethod
+    @abstractmethod
+    def get_carro_popular() -> VeiculoPopular: pass
+
+    @staticmethod
+    @abstractmethod
+    def get_moto_luxo() -> VeiculoLuxo: pass
+
+    @staticmethod
+    @abstractmethod
+    def get_moto_popular() -> VeiculoPopular: pass
+
+
+class ZonaNorteVeiculoFactory(VeiculoFactory):
+    @staticmethod
+    def get_carro_luxo() -> VeiculoLuxo:
+        return CarroLuxoZN()
+
+    @staticmethod
+    def get_carro_popular() -> VeiculoPopular:
+        return CarroPopularZN()
+
+    @staticmethod
+    def get_moto_luxo() -> VeiculoLuxo:
+        return MotoLuxoZN()
+
+    @staticmethod
+    def get_moto_popular() -> VeiculoPopular:
+        return MotoPopularZN()
+
+
+class ZonaSulVeiculoFactory(VeiculoFactory):
+    @staticmethod
+    def get_carro_luxo() -> VeiculoLuxo:
+        return CarroLuxoZS()
+
+    @staticmethod
+    def get_carro_popular() -> VeiculoPopular:
+        return CarroPopularZS()
+
+    @staticmethod
+    def get_moto_luxo() -> VeiculoLuxo:
+        return MotoLuxoZS()
+
+    @staticmethod
+    def get_moto_popular() -> VeiculoPopular:
+        return MotoPopularZS()
+
+
+TIPOS = ('carro_luxo', 'carro_popular', 'moto_luxo', 'moto_popular')
+
+
+@dataclass
+class Corrida:
+    zona: str
+    tipo: str
+    criada_em: float = field(default_factory=time.perf_counter)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def percentil_ponderado(amostras: List[Tuple[List[float], float]],
+                        p: float) -> float:
+    """ amostras: (valores, peso de cada valor dessa amostra) """
+    pares = sorted((valor, peso) for valores, peso in amostras
+                   for valor in valores)
+    if not pares:
+        return 0.0
+    alvo = p * sum(peso for _, peso in pares)
+    acumulado = 0.0
+    for valor, peso in pares:
+        acumulado += peso
+        if acumulado > alvo:
+            return valor
+    return pares[-1][0]
+
+
+class AmostraLatencias:
+    """ Guarda no máximo "tamanho" latências, sorteadas uniformemente """
+
+    def __init__(self, tamanho: int = 10_000) -> None:
+        self.tamanho = tamanho
+        self.contagem = 0
+        self.valores: List[float] = []
+
+    def __len__(self) -> int:
+        return self.contagem
+
+    @property
+    def peso(self) -> float:
+        """ Quantos pedidos cada valor guardado representa """
+        return self.contagem / len(self.valores) if self.valores else 0.0
+
+    def adicionar(self, valor: float) -> None:
+        self.contagem += 1
+        if len(self.valores) < self.tamanho:
+            self.valores.append(valor)
+            return
+        posicao = random.randrange(self.contagem)
+        if posicao < self.tamanho:
+            self.valores[posicao] = valor
+
+
+class ZonaShard:
+    def __init__(self, zona: str, factory: VeiculoFactory,
+                 max_fila: int) -> None:
+        self.zona = zona
+        self.factory = factory
+        self.fila: asyncio.Queue = asyncio.Queue(max_fila)
+        self.latencias = AmostraLatencias()
+        self.rejeitadas = 0
+        self.falhas = 0
+        self.ultimo_resultado: Optional[str] = None
+
+    def _atender(self, corrida: Corrida) -> None:
+        try:
+            veiculo = getattr(self.factory, f'get_{corrida.tipo}')()
+            self.ultimo_resultado = veiculo.buscar_cliente()
+            self.latencias.adicionar(time.perf_counter() - corrida.criada_em)
+        except Exception:
+            self.falhas += 1
+        finally:
+            # Sempre, para o stop() não ficar preso em fila.join()
+            self.fila.task_done()
+
+    async def run(self) -> None:
+        fila = self.fila
+        while True:
+            self._atender(await fila.get())
+            # Atende o que já está na fila sem voltar ao event loop
+            while not fila.empty():
+                self._atender(fila.get_nowait())
+
+
+class Despachante:
+    def __init__(self, factories: Dict[str, VeiculoFactory],
+                 max_fila: int = 1000) -> None:
+        self.shards = {
+            zona: ZonaShard(zona, factory, max_fila)
+            for zona, factory in factories.items()
+        }
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(shard.run(), name=f'zona-{zona}')
+            for zona, shard in self.shards.items()
+        ]
+
+    async def stop(self) -> None:
+        """ Espera as filas esvaziarem e encerra os shards """
+        for shard in self.shards.values():
+            await shard.fila.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _shard(self, zona: str, tipo: str) -> ZonaShard:
+        if tipo not in TIPOS:
+            raise ValueError(f'Veículo não existe: {tipo}')
+        if zona not in self.shards:
+            raise ValueError(f'Zona não existe: {zona}')
+        return self.shards[zona]
+
+    async def submit(self, zona: str, tipo: str) -> None:
+        await self._shard(zona, tipo).fila.put(Corrida(zona, tipo))
+
+    def try_submit(self, zona: str, tipo: str) -> bool:
+        shard = self._shard(zona, tipo)
+        try:
+            shard.fila.put_nowait(Corrida(zona, tipo))
+        except asyncio.QueueFull:
+            shard.rejeitadas += 1
+            return False
+        return True
+
+    def metricas(self) -> Dict[str, Dict]:
+        resultado = {}
+        amostras: List[Tuple[List[float], float]] = []
+        for zona, shard in self.shards.items():
+            amostra = shard.latencias.valores
+            amostras.append((amostra, shard.latencias.peso))
+            resultado[zona] = {
+                'atendidas': len(shard.latencias),
+                'rejeitadas': shard.rejeitadas,
+                'falhas': shard.falhas,
+                'p50': percentil(amostra, 0.5),
+                'p99': percentil(amostra, 0.99),
+            }
+        resultado['total'] = {
+            'atendidas': sum(len(s.latencias) for s in self.shards.values()),
+            'rejeitadas': sum(s.rejeitadas for s in self.shards.values()),
+            'falhas': sum(s.falhas for s in self.shards.values()),
+            'p50': percentil_ponderado(amostras, 0.5),
+            'p99': percentil_ponderado(amostras, 0.99),
+        }
+        return resultado
+
+
+if __name__ == "__main__":
+    N_CORRIDAS = 300_000
+    N_ZONAS = 64
+    N_PRODUTORES = 16
+
+    async def demo() -> None:
+        despachante = Despachante({
+            'norte': ZonaNorteVeiculoFactory(),
+            'sul': ZonaSulVeiculoFactory(),
+        })
+        await despachante.start()
+        for zona in ['norte', 'sul']:
+            for tipo in TIPOS:
+                await despachante.submit(zona, tipo)
+                await asyncio.sleep(0)
+                print(despachante.shards[zona].ultimo_resultado)
+        try:
+            await despachante.submit('norte', 'bicicleta')
+        except ValueError as error:
+            print('ValueError:', error)
+        await despachante.stop()
+
+        # Zona com 10 pedidos e amostra de 2 pesa 5 vezes mais no total
+        cheia, vazia = AmostraLatencias(2), AmostraLatencias()
+        for _ in range(10):
+            cheia.adicionar(1.0)
+        vazia.adicionar(9.0)
+        assert percentil_ponderado(
+            [(cheia.valores, cheia.peso), (vazia.valores, vazia.peso)], 0.5
+        ) == 1.0
+
+    def gerar_corridas(zonas: List[str]) -> List:
+        # Carga desigual: algumas zonas recebem muito mais pedidos
+        pesos = [1 / (i + 1) for i in range(len(zonas))]
+        escolhidas = random.choices(zonas, weights=pesos, k=N_CORRIDAS)
+        return [(zona, random.choice(TIPOS)) for zona in escolhidas]
+
+    def serial(corridas: List) -> float:
+        """ Como o Cliente de abstract_factory.py: uma por vez """
+        factories = {
+            zona: (ZonaNorteVeiculoFactory() if i % 2 == 0
+                   else ZonaSulVeiculoFactory())
+            for i, zona in enumerate(dict.fromkeys(z for z, _ in corridas))
+        }
+        start = time.perf_counter()
+        for zona, tipo in corridas:
+            getattr(factories[zona], f'get_{tipo}')().buscar_cliente()
+        return time.perf_counter() - start
+
+    async def carga(corridas: List, zonas: List[str], max_fila: int,
+                    com_espera: bool) -> None:
+        despachante = Despachante({
+            zona: (ZonaNorteVeiculoFactory() if i % 2 == 0
+                   else ZonaSulVeiculoFactory())
+            for i, zona in enumerate(zonas)
+        }, max_fila=max_fila)
+        await despachante.start()
+
+        async def produtor(parte: List) -> None:
+            for i, (zona, tipo) in enumerate(parte):
+                if com_espera:
+                    await despachante.submit(zona, tipo)
+                else:
+                    despachante.try_submit(zona, tipo)
+                if i % 64 == 0:
+                    # Simula a chegada de pedidos pela rede
+                    await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            produtor(corridas[i::N_PRODUTORES]) for i in range(N_PRODUTORES)
+        ])
+        await despachante.stop()
+        elapsed = time.perf_counter() - start
+
+        total = despachante.metricas()['total']
+        nome = 'submit (espera)' if com_espera else 'try_submit (recusa)'
+        print(f'{nome:<22}{max_fila:>8}{total["atendidas"] / elapsed:>14,.0f}'
+              f'{total["rejeitadas"]:>12,}{total["p50"] * 1e3:>10.2f}'
+              f'{total["p99"] * 1e3:>10.2f}')
+
+    async def main() -> None:
+        await demo()
+        print()
+
+        zonas = [f'zona-{i}' for i in range(N_ZONAS)]
+        corridas = gerar_corridas(zonas)
+        elapsed = serial(corridas)
+        print(f'{N_CORRIDAS:,} corridas em {N_ZONAS} zonas, '
+              f'{N_PRODUTORES} produtores')
+        print(f'serial (referência): {N_CORRIDAS / elapsed:,.0f} corridas/s')
+        print(f'{"modo":<22}{"fila":>8}{"corridas/s":>14}{"recusadas":>12}'
+              f'{"p50 (ms)":>10}{"p99 (ms)":>10}')
+        for max_fila in (16, 256, 4096):
+            await carga(corridas, zonas, max_fila, com_espera=True)
+        for max_fila in (16, 256):
+            await carga(corridas, zonas, max_fila, com_espera=False)
+
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""
+LoteMixin: get_carros e iter_carros para as factories das três aulas
+(Simple Factory, Factory Method e Abstract Factory).
+
+Fica aqui, um nível acima das pastas das aulas, para existir uma única
+implementação: cada aula coloca esta pasta no sys.path e importa daqui.
+"""
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List
+
+
+class LoteMixin:
+    """
+    get_carros e iter_carros para as factories. _construtor(tipo) devolve
+    a função que cria um veículo do tipo; por padrão é o próprio get_carro
+    com o tipo já aplicado, chamado uma vez por veículo.
+    """
+
+    @classmethod
+    def _construtor(cls, tipo: str) -> Callable:
+        return partial(cls.get_carro, tipo)
+
+    @classmethod
+    def get_carros(cls, tipos: Iterable[str], agrupados: bool = False):
+        """
+        Cria vários veículos de uma vez. O construtor de cada tipo é
+        resolvido uma única vez, e não a cada veículo. Retorna os veículos
+        na ordem de entrada ou, com agrupados=True, um dicionário
+        tipo -> veículos.
+        """
+        tipos = list(tipos)
+        carros = list(cls.iter_carros(tipos))
+        if not agrupados:
+            return carros
+
+        grupos: Dict[str, List] = {tipo: [] for tipo in dict.fromkeys(tipos)}
+        for tipo, carro in zip(tipos, carros):
+            grupos[tipo].append(carro)
+        return grupos
+
+    @classmethod
+    def iter_carros(cls, tipos: Iterable[str]) -> Iterator:
+        """ Versão em streaming, para entradas sem fim """
+        construtores: Dict[str, Callable] = {}
+        for tipo in tipos:
+            construtor = construtores.get(tipo)
+            if construtor is None:
+                construtor = construtores[tipo] = cls._construtor(tipo)
+            yield construtor()
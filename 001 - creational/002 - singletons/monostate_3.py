@@ -0,0 +1,223 @@
+"""
+Monostate (ou Borg) entre processos.
+
+Em monostate_2.py o estado compartilhado é um dicionário (_state) que só
+existe dentro de um interpretador. Com um processo por núcleo, cada
+processo tem a sua cópia e uma alteração em um deles não chega nos outros.
+
+Aqui o estado é um registro de esquema fixo guardado em
+multiprocessing.shared_memory. Todos os processos leem e escrevem na mesma
+memória, sem IPC, usando um seqlock:
+    - O escritor incrementa um contador de sequência (fica ímpar), grava
+      os campos e incrementa de novo (fica par).
+    - O leitor lê o contador, lê os campos e lê o contador de novo. Se ele
+      mudou ou estava ímpar, houve uma escrita no meio e a leitura é
+      repetida. Leitores nunca travam.
+
+Escritores são serializados por um multiprocessing.Lock. O registro deve
+ser criado no processo pai antes dos workers serem criados com fork,
+para que todos herdem a mesma memória e a mesma trava.
+
+Rode este arquivo para ver o benchmark de leituras e escritas por
+segundo com 8 processos.
+"""
+import multiprocessing
+import struct
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict
+
+
+class SeqlockRecord:
+    _header = struct.Struct('=Q')
+
+    def __init__(self, schema: Dict[str, str]) -> None:
+        self._fields = list(schema)
+        # Tamanho máximo em bytes de cada campo de texto
+        self._text_fields = {
+            name: struct.calcsize(fmt)
+            for name, fmt in schema.items() if fmt.endswith('s')
+        }
+        self._body = struct.Struct('=' + ''.join(schema.values()))
+        self._shm = SharedMemory(
+            create=True, size=self._header.size + self._body.size
+        )
+        self._buf = self._shm.buf
+        self._buf[:] = bytes(len(self._buf))
+        self._lock = multiprocessing.Lock()
+
+    def read(self) -> Dict:
+        header, body, buf = self._header, self._body, self._buf
+        offset = header.size
+
+        while True:
+            seq1, = header.unpack_from(buf)
+            if seq1 & 1:
+                continue
+            values = body.unpack_from(buf, offset)
+            seq2, = header.unpack_from(buf)
+            if seq1 == seq2:
+                break
+
+        data = dict(zip(self._fields, values))
+        for name in self._text_fields:
+            data[name] = data[name].rstrip(b'\x00').decode()
+        return data
+
+    def write(self, **changes) -> None:
+        # Valida tudo antes de pegar a trava: o struct cortaria um texto
+        # longo demais em silêncio (até no meio de um caractere UTF-8)
+        for name, value in changes.items():
+            if name not in self._fields:
+                raise AttributeError(f'{name} não faz parte do esquema')
+            if name in self._text_fields:
+                value = changes[name] = value.encode()
+                size = self._text_fields[name]
+                if len(value) > size:
+                    raise ValueError(f'{name} tem {len(value)} bytes; o '
+                                     f'máximo é {size}')
+
+        with self._lock:
+            seq, = self._header.unpack_from(self._buf)
+            # Só um escritor por vez, então ler sem seqlock é seguro aqui
+            data = self._unpack_raw()
+            data.update(changes)
+            body = self._body.pack(*[data[name] for name in self._fields])
+
+            self._header.pack_into(self._buf, 0, seq + 1)
+            self._buf[self._header.size:] = body
+            self._header.pack_into(self._buf, 0, seq + 2)
+
+    def _unpack_raw(self) -> Dict:
+        values = self._body.unpack_from(self._buf, self._header.size)
+        return dict(zip(self._fields, values))
+
+    def close(self) -> None:
+        self._buf.release()
+        self._shm.close()
+        self._shm.unlink()
+
+
+class MonoStateShared:
+    # Formatos do módulo struct. Textos têm tamanho fixo em bytes (UTF-8).
+    _schema: Dict[str, str] = {'nome': '32s', 'sobrenome': '32s'}
+    _record = None
+
+    def __init__(self, nome=None, sobrenome=None) -> None:
+        changes = {}
+        if nome is not None:
+            changes['nome'] = nome
+        if sobrenome is not None:
+            changes['sobrenome'] = sobrenome
+        if changes:
+            self.update(**changes)
+
+    @classmethod
+    def _get_record(cls) -> SeqlockRecord:
+        # O registro pertence à classe que declarou o esquema, assim
+        # subclasses compartilham o mesmo estado (como A em monostate_2)
+        owner = next(k for k in cls.__mro__ if '_schema' in vars(k))
+        if owner._record is None:
+            owner._record = SeqlockRecord(owner._schema)
+        return owner._record
+
+    def __getattr__(self, name):
+        if name in self._schema:
+            return self._get_record().read()[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value) -> None:
+        self._get_record().write(**{name: value})
+
+    def update(self, **changes) -> None:
+        """ Altera vários campos numa única escrita consistente """
+        self._get_record().write(**changes)
+
+    def snapshot(self) -> Dict:
+        return self._get_record().read()
+
+    def __str__(self) -> str:
+        params = ', '.join([
+            f'{k}={v}' for k, v in self.snapshot().items()
+        ])
+        return f'{self.__class__.__name__}({params})'
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class A(MonoStateShared):
+    pass
+
+
+if __name__ == "__main__":
+    import time
+
+    N_PROCESSES = 8
+    DURATION = 2.0
+
+    def reader(results) -> None:
+        state = MonoStateShared()
+        reads = torn = 0
+        deadline = time.perf_counter() + DURATION
+        while time.perf_counter() < deadline:
+            for _ in range(1000):
+                data = state.snapshot()
+                # O escritor sempre grava o mesmo número nos dois campos
+                if data['nome'][1:] != data['sobrenome'][1:]:
+                    torn += 1
+            reads += 1000
+        results.put(('read', reads, torn))
+
+    def writer(results) -> None:
+        state = MonoStateShared()
+        writes = 0
+        deadline = time.perf_counter() + DURATION
+        while time.perf_counter() < deadline:
+            for _ in range(1000):
+                state.update(nome=f'n{writes}', sobrenome=f's{writes}')
+                writes += 1
+        results.put(('write', writes, 0))
+
+    def run(n_writers: int) -> None:
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        targets = [writer] * n_writers + [reader] * (N_PROCESSES - n_writers)
+        processes = [
+            context.Process(target=target, args=(results,))
+            for target in targets
+        ]
+        for process in processes:
+            process.start()
+
+        totals = {'read': 0, 'write': 0}
+        torn = 0
+        for _ in processes:
+            kind, count, torn_reads = results.get()
+            totals[kind] += count
+            torn += torn_reads
+        for process in processes:
+            process.join()
+
+        print(f'{n_writers:>10}{N_PROCESSES - n_writers:>10}'
+              f'{totals["read"] / DURATION:>16,.0f}'
+              f'{totals["write"] / DURATION:>16,.0f}{torn:>10}')
+
+    ms1 = MonoStateShared('Robert', 'Cruz')
+    ms2 = A(sobrenome='Inacio')
+    print(ms1)
+    print(ms2)
+    try:
+        ms1.nome = 'Ç' * 17
+    except ValueError as error:
+        print('ValueError:', error)
+    ms1.update(nome='n0', sobrenome='s0')
+    print()
+
+    print(f'{N_PROCESSES} processos, {DURATION:.0f}s por cenário')
+    print(f'{"escritores":>10}{"leitores":>10}{"leituras/s":>16}'
+          f'{"escritas/s":>16}{"rasgadas":>10}')
+    try:
+        for n_writers in (0, 1, 2, 4):
+            run(n_writers)
+    finally:
+        MonoStateShared._get_record().close()
@@ -0,0 +1,129 @@
+"""
+Singleton thread-safe com double-checked locking.
+
+O metaclass de singleton_3.py faz "verifica e depois insere" em
+_instances sem nenhuma trava. Com várias threads, duas delas podem
+passar pela verificação ao mesmo tempo e construir a classe duas vezes.
+
+Aqui a verificação é feita duas vezes:
+    1. Sem trava (caminho rápido): depois da primeira construção,
+       toda chamada é só uma consulta ao dicionário.
+    2. Com uma trava por classe: só acontece enquanto a instância
+       ainda não existe, e garante que apenas uma thread construa.
+
+Rode este arquivo para ver o benchmark de contenção (1 a 64 threads)
+comparando esta versão com singleton_1.py, singleton_2.py e
+singleton_3.py.
+"""
+from threading import Lock
+from typing import Dict
+
+
+class ThreadSafeSingleton(type):
+    _instances: Dict = {}
+    _locks: Dict = {}
+
+    def __call__(cls, *args, **kwargs):
+        # Caminho rápido: sem trava depois que a instância existe
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance
+
+        # dict.setdefault é atômico, então todas as threads recebem
+        # a mesma trava para esta classe
+        lock = cls._locks.setdefault(cls, Lock())
+        with lock:
+            instance = cls._instances.get(cls)
+            if instance is None:
+                instance = super().__call__(*args, **kwargs)
+                cls._instances[cls] = instance
+        return instance
+
+
+class AppSettings(metaclass=ThreadSafeSingleton):
+    def __init__(self) -> None:
+        """ O init será chamado apenas uma vez """
+        self.tema = 'O tema escuro'
+        self.font = '18px'
+
+
+if __name__ == "__main__":
+    import time
+    from threading import Barrier, Thread
+    from typing import Callable, List
+
+    from singleton_2 import singleton
+    from singleton_3 import Singleton
+
+    CALLS_PER_THREAD = 10_000
+    THREAD_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+
+    def slow_init(self) -> None:
+        # Aumenta a janela de corrida durante a primeira construção.
+        # No singleton_1 o init roda a cada chamada, então só a
+        # primeira é lenta.
+        if not hasattr(self, 'ready'):
+            time.sleep(0.001)
+            self.ready = True
+
+    def new_based() -> Callable:
+        class Settings:
+            _instance = None
+
+            def __new__(cls, *args, **kwargs):
+                if not cls._instance:
+                    cls._instance = super().__new__(cls)
+                return cls._instance
+
+            __init__ = slow_init
+        return Settings
+
+    def decorator_based() -> Callable:
+        return singleton(type('Settings', (), {'__init__': slow_init}))
+
+    def metaclass_based() -> Callable:
+        return Singleton('Settings', (), {'__init__': slow_init})
+
+    def thread_safe_based() -> Callable:
+        return ThreadSafeSingleton('Settings', (), {'__init__': slow_init})
+
+    def run(factory: Callable, n_threads: int):
+        cls = factory()
+        barrier = Barrier(n_threads)
+        seen: List = []
+
+        def worker() -> None:
+            barrier.wait()
+            seen.append(id(cls()))
+            for _ in range(CALLS_PER_THREAD):
+                cls()
+
+        threads = [Thread(target=worker) for _ in range(n_threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return elapsed, len(set(seen))
+
+    approaches = {
+        'singleton_1 (__new__)': new_based,
+        'singleton_2 (decorator)': decorator_based,
+        'singleton_3 (metaclass)': metaclass_based,
+        'singleton_4 (thread-safe)': thread_safe_based,
+    }
+
+    as1 = AppSettings()
+    as1.tema = 'O tema claro'
+    print(AppSettings().tema, as1 is AppSettings())
+    print()
+
+    print(f'{"abordagem":<28}{"threads":>8}{"ns/chamada":>12}'
+          f'{"instâncias":>12}')
+    for name, factory in approaches.items():
+        for n_threads in THREAD_COUNTS:
+            elapsed, instances = run(factory, n_threads)
+            per_call = elapsed / (n_threads * CALLS_PER_THREAD) * 1e9
+            print(f'{name:<28}{n_threads:>8}{per_call:>12.1f}'
+                  f'{instances:>12}')
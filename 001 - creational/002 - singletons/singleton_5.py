@@ -0,0 +1,184 @@
+"""
+Registro de singletons que conhece o fork do processo.
+
+Servidores pre-fork (gunicorn, uwsgi, multiprocessing com "fork") copiam
+o processo pai inteiro para cada worker, inclusive o dicionário
+"instances" de singleton_2.py e Singleton._instances de singleton_3.py.
+Um singleton que guarda uma trava, um socket ou uma thread fica inválido
+no filho, porque esses recursos pertencem ao processo pai.
+
+Aqui cada singleton declara o que deve acontecer no fork:
+    SHARE_AFTER_FORK: construído no pai antes do fork (prefork) e
+        compartilhado pelos filhos. As páginas de memória ficam em
+        copy-on-write, então N workers não guardam N cópias. prefork
+        congela o GC (gc.freeze); depois de criar os filhos, o pai chama
+        after_forks, que descongela (gc.unfreeze), senão o pai nunca mais
+        coleta os objetos que existiam no prefork.
+    REBUILD_IN_CHILD: descartado no filho logo após o fork (via
+        os.register_at_fork) e reconstruído na primeira chamada.
+
+Rode este arquivo (Linux) para ver a memória de N workers com e sem
+o compartilhamento pré-fork.
+"""
+import gc
+import os
+from threading import Lock
+from typing import Callable, Dict, Tuple
+
+SHARE_AFTER_FORK = 'share'
+REBUILD_IN_CHILD = 'rebuild'
+
+
+class ForkAwareRegistry:
+    def __init__(self) -> None:
+        self._factories: Dict[type, Tuple[Callable, str]] = {}
+        self._instances: Dict = {}
+        self._lock = Lock()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def register(self, class_, policy: str = SHARE_AFTER_FORK) -> None:
+        assert policy in (SHARE_AFTER_FORK, REBUILD_IN_CHILD), \
+            'Política de fork não existe'
+        self._factories[class_] = (class_, policy)
+
+    def get(self, class_):
+        instance = self._instances.get(class_)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if class_ not in self._instances:
+                factory, _ = self._factories[class_]
+                self._instances[class_] = factory()
+            return self._instances[class_]
+
+    def prefork(self) -> None:
+        """ Chamar no processo pai, imediatamente antes dos forks """
+        for class_, (_, policy) in self._factories.items():
+            if policy == SHARE_AFTER_FORK:
+                self.get(class_)
+
+        # Move os objetos existentes para a geração permanente do GC.
+        # Assim o coletor dos filhos não escreve nos cabeçalhos desses
+        # objetos e as páginas continuam compartilhadas.
+        gc.freeze()
+
+    def after_forks(self) -> None:
+        """ Chamar no processo pai, depois de criar todos os filhos """
+        # Desfaz o gc.freeze do prefork só no pai: os filhos continuam
+        # com os objetos congelados
+        gc.unfreeze()
+
+    def _after_fork_in_child(self) -> None:
+        # A trava do pai pode ter sido copiada no estado "adquirida"
+        self._lock = Lock()
+
+        for class_, (_, policy) in self._factories.items():
+            if policy == REBUILD_IN_CHILD:
+                self._instances.pop(class_, None)
+
+
+registry = ForkAwareRegistry()
+
+
+def singleton(policy: str = SHARE_AFTER_FORK):
+    def decorator(class_):
+        registry.register(class_, policy)
+
+        def get_instance():
+            return registry.get(class_)
+
+        return get_instance
+
+    return decorator
+
+
+@singleton(SHARE_AFTER_FORK)
+class AppSettings:
+    def __init__(self) -> None:
+        self.tema = 'O tema escuro'
+        self.font = '18px'
+        # Tabela grande e somente leitura: ótima candidata a ser
+        # compartilhada entre os workers
+        self.traducoes = {
+            f'chave_{i}': f'valor_{i}' for i in range(300_000)
+        }
+
+
+@singleton(REBUILD_IN_CHILD)
+class Conexao:
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.lock = Lock()
+
+
+if __name__ == "__main__":
+    import sys
+
+    N_WORKERS = 8
+
+    def memory_kb() -> Dict[str, int]:
+        """ RSS e memória privada (não compartilhada) do processo atual """
+        result = {'Rss': 0, 'Private': 0}
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                key, value = line.split(':', 1)
+                if key == 'Rss':
+                    result['Rss'] = int(value.split()[0])
+                elif key in ('Private_Clean', 'Private_Dirty'):
+                    result['Private'] += int(value.split()[0])
+        return result
+
+    def worker(write_fd: int) -> None:
+        settings = AppSettings()
+        conexao = Conexao()
+        assert conexao.pid == os.getpid(), 'Conexão herdada do pai'
+        settings.traducoes.get('chave_42')
+
+        gc.collect()
+        mem = memory_kb()
+        os.write(write_fd, f'{mem["Rss"]} {mem["Private"]}\n'.encode())
+
+    def run(use_prefork: bool) -> Tuple[int, int]:
+        if use_prefork:
+            registry.prefork()
+
+        total_rss = total_private = 0
+        for _ in range(N_WORKERS):
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                try:
+                    worker(write_fd)
+                finally:
+                    os._exit(0)
+
+            os.close(write_fd)
+            with os.fdopen(read_fd) as reader:
+                rss, private = map(int, reader.read().split())
+            os.waitpid(pid, 0)
+            total_rss += rss
+            total_private += private
+        if use_prefork:
+            registry.after_forks()
+            assert gc.get_freeze_count() == 0
+        return total_rss, total_private
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit('Este benchmark precisa de fork e /proc (Linux)')
+
+    # Cada cenário roda num processo novo para não herdar o outro
+    print(f'{N_WORKERS} workers')
+    print(f'{"cenário":<12}{"RSS total (MB)":>16}{"privada total (MB)":>20}')
+    for use_prefork in (False, True):
+        pid = os.fork()
+        if pid == 0:
+            rss, private = run(use_prefork)
+            name = 'prefork' if use_prefork else 'lazy'
+            print(f'{name:<12}{rss / 1024:>16.1f}{private / 1024:>20.1f}')
+            sys.stdout.flush()
+            os._exit(0)
+        os.waitpid(pid, 0)
@@ -0,0 +1,133 @@
+"""
+Decorator de singleton para classes com inicialização assíncrona.
+
+O decorator de singleton_2.py só funciona com construtores síncronos.
+Aqui a classe pode definir "async def setup(self)" para fazer I/O
+(ler arquivos, abrir conexões...) e a instância é obtida com
+"await AppSettings()".
+
+Se muitas corrotinas chamarem ao mesmo tempo durante o startup, todas
+esperam pela mesma Task de inicialização (asyncio.shield), em vez de
+cada uma construir o seu próprio objeto.
+
+Se a inicialização falhar (ou a Task for cancelada), a próxima tentativa
+começa uma inicialização nova, e quem estava esperando tenta de novo
+(até "retries" vezes) juntando-se a ela. Cancelar uma corrotina que está
+esperando não cancela a inicialização das outras.
+"""
+import asyncio
+from typing import Dict
+
+
+def async_singleton(class_=None, *, retries: int = 2):
+    if class_ is None:
+        return lambda c: async_singleton(c, retries=retries)
+
+    instances: Dict = {}
+    pending: Dict = {}
+
+    async def build(*args, **kwargs):
+        instance = class_(*args, **kwargs)
+        setup = getattr(instance, 'setup', None)
+        if setup is not None:
+            await setup()
+        return instance
+
+    def on_done(task: asyncio.Task) -> None:
+        if pending.get(class_) is task:
+            del pending[class_]
+        if not task.cancelled() and task.exception() is None:
+            instances[class_] = task.result()
+
+    async def get_instance(*args, **kwargs):
+        for attempt in range(retries + 1):
+            if class_ in instances:
+                return instances[class_]
+
+            task = pending.get(class_)
+            if task is None:
+                task = asyncio.ensure_future(build(*args, **kwargs))
+                task.add_done_callback(on_done)
+                pending[class_] = task
+
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                # Só tenta de novo se quem foi cancelada foi a
+                # inicialização, e não a corrotina que está esperando
+                if not task.cancelled() or attempt == retries:
+                    raise
+            except Exception:
+                if attempt == retries:
+                    raise
+
+    return get_instance
+
+
+@async_singleton
+class AppSettings:
+    def __init__(self) -> None:
+        self.tema = None
+        self.font = None
+
+    async def setup(self) -> None:
+        """ Simula a leitura das configurações de um serviço remoto """
+        await asyncio.sleep(0.01)
+        self.tema = 'O tema escuro'
+        self.font = '18px'
+
+
+if __name__ == "__main__":
+    import time
+
+    N_CALLS = 10_000
+
+    def make_class(failures: int):
+        """ Classe que conta inicializações e falha nas primeiras """
+        class Settings:
+            inits = 0
+
+            async def setup(self) -> None:
+                Settings.inits += 1
+                await asyncio.sleep(0.01)
+                if Settings.inits <= failures:
+                    raise ConnectionError('Serviço indisponível')
+
+        return Settings
+
+    async def scenario(name: str, failures: int, cancel_every: int) -> None:
+        class_ = make_class(failures)
+        get_instance = async_singleton(class_)
+
+        start = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(get_instance()) for _ in range(N_CALLS)
+        ]
+        await asyncio.sleep(0)
+        if cancel_every:
+            for task in tasks[::cancel_every]:
+                task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+        ok = [r for r in results if isinstance(r, class_)]
+        cancelled = sum(
+            isinstance(r, asyncio.CancelledError) for r in results
+        )
+        print(f'{name:<26}{class_.inits:>8}{len({id(r) for r in ok}):>12}'
+              f'{len(ok):>8}{cancelled:>12}{elapsed * 1000:>10.1f}')
+
+    async def main() -> None:
+        as1 = await AppSettings()
+        as2 = await AppSettings()
+        print(as1.tema, as1 is as2)
+        print()
+
+        print(f'{N_CALLS} chamadas concorrentes na primeira utilização')
+        print(f'{"cenário":<26}{"inits":>8}{"instâncias":>12}{"ok":>8}'
+              f'{"canceladas":>12}{"ms":>10}')
+        await scenario('sem falhas', failures=0, cancel_every=0)
+        await scenario('1ª inicialização falha', failures=1, cancel_every=0)
+        await scenario('cancelando 1 a cada 10', failures=0, cancel_every=10)
+
+    asyncio.run(main())
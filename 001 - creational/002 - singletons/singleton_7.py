@@ -0,0 +1,230 @@
+"""
+Container de singletons com inicialização paralela no boot.
+
+Em singleton_3.py cada singleton é construído na primeira chamada, um
+depois do outro. A latência da primeira requisição é a soma de todos os
+inicializadores.
+
+Aqui cada singleton declara de quais outros ele depende. O container
+monta o grafo de dependências e, no boot, constrói ao mesmo tempo (num
+pool de threads) todos os singletons cujas dependências já estão prontas.
+O tempo de boot passa a ser o da cadeia mais longa (caminho crítico) e
+não a soma de tudo.
+
+Depois do boot, cada singleton é só uma consulta ao dicionário. Fora do
+boot, get constrói de forma preguiçosa com double-checked locking (uma
+trava por singleton, como em singleton_4.py): várias threads pedindo o
+mesmo singleton constroem uma única instância.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import RLock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class Container:
+    def __init__(self) -> None:
+        self._factories: Dict[str, Callable] = {}
+        self._dependencies: Dict[str, Tuple[str, ...]] = {}
+        # RLock: get de um singleton chama get das dependências
+        self._locks: Dict[str, RLock] = {}
+        self._instances: Dict = {}
+        self.init_times: Dict[str, float] = {}
+
+    def register(self, name: str, depends_on: Sequence[str] = ()):
+        """
+        Decorator. A factory recebe as dependências já construídas como
+        argumentos nomeados.
+        """
+        def decorator(factory: Callable) -> Callable:
+            self._factories[name] = factory
+            self._dependencies[name] = tuple(depends_on)
+            self._locks.setdefault(name, RLock())
+            return factory
+
+        return decorator
+
+    def get(self, name: str):
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+
+        # Fora do boot: constrói de forma preguiçosa, em série
+        with self._locks[name]:
+            if name not in self._instances:
+                kwargs = {
+                    dep: self.get(dep) for dep in self._dependencies[name]
+                }
+                self._build(name, kwargs)
+        return self._instances[name]
+
+    def _build(self, name: str, kwargs: Dict) -> None:
+        with self._locks[name]:
+            # Um get em outra thread pode ter construído antes do boot
+            if name in self._instances:
+                return
+            start = time.perf_counter()
+            instance = self._factories[name](**kwargs)
+            self.init_times[name] = time.perf_counter() - start
+            self._instances[name] = instance
+
+    def reset(self) -> None:
+        """ Descarta as instâncias construídas (mantém os registros) """
+        self._instances.clear()
+        self.init_times.clear()
+
+    def _check_graph(self) -> None:
+        for name, deps in self._dependencies.items():
+            for dep in deps:
+                if dep not in self._factories:
+                    raise KeyError(f'{name} depende de {dep}, que não existe')
+
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f'Dependência circular em {name}')
+            visiting.add(name)
+            for dep in self._dependencies[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self._factories:
+            visit(name)
+
+    def boot(self, max_workers: Optional[int] = None) -> float:
+        """ Constrói todos os singletons. Retorna o tempo total. """
+        self._check_graph()
+        remaining = {
+            name: set(deps) - set(self._instances)
+            for name, deps in self._dependencies.items()
+            if name not in self._instances
+        }
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running: Dict = {}
+            while remaining or running:
+                ready = [name for name, deps in remaining.items() if not deps]
+                for name in ready:
+                    del remaining[name]
+                    kwargs = {
+                        dep: self._instances[dep]
+                        for dep in self._dependencies[name]
+                    }
+                    future = executor.submit(self._build, name, kwargs)
+                    running[future] = name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    future.result()
+                    for deps in remaining.values():
+                        deps.discard(name)
+
+        return time.perf_counter() - start
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """ Cadeia de dependências com a maior soma de tempos de init """
+        best: Dict[str, Tuple[float, List[str]]] = {}
+
+        def longest(name: str) -> Tuple[float, List[str]]:
+            if name not in best:
+                chains = [longest(dep) for dep in self._dependencies[name]]
+                total, path = max(chains, default=(0.0, []))
+                best[name] = (
+                    total + self.init_times.get(name, 0.0), path + [name]
+                )
+            return best[name]
+
+        total, path = max(
+            (longest(name) for name in self._factories), default=(0.0, [])
+        )
+        return path, total
+
+    def report(self) -> str:
+        lines = [f'{"singleton":<16}{"init (ms)":>12}']
+        for name, seconds in self.init_times.items():
+            lines.append(f'{name:<16}{seconds * 1000:>12.1f}')
+        path, total = self.critical_path()
+        lines.append(
+            f'caminho crítico: {" -> ".join(path)} ({total * 1000:.1f} ms)'
+        )
+        return '\n'.join(lines)
+
+
+container = Container()
+
+
+@container.register('config')
+def make_config():
+    time.sleep(0.05)
+    return {'tema': 'O tema escuro', 'font': '18px'}
+
+
+@container.register('database', depends_on=['config'])
+def make_database(config):
+    time.sleep(0.1)
+    return {'dsn': 'postgres://', 'config': config}
+
+
+@container.register('cache', depends_on=['config'])
+def make_cache(config):
+    time.sleep(0.08)
+    return {'url': 'redis://'}
+
+
+@container.register('templates')
+def make_templates():
+    time.sleep(0.12)
+    return {'base': '<html></html>'}
+
+
+@container.register('translations')
+def make_translations():
+    time.sleep(0.07)
+    return {'pt-BR': {}}
+
+
+@container.register('repository', depends_on=['database', 'cache'])
+def make_repository(database, cache):
+    time.sleep(0.04)
+    return {'database': database, 'cache': cache}
+
+
+@container.register('app', depends_on=['repository', 'templates',
+                                       'translations'])
+def make_app(repository, templates, translations):
+    time.sleep(0.02)
+    return {'repository': repository}
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    container.get('app')
+    serial = time.perf_counter() - start
+    container.reset()
+
+    elapsed = container.boot()
+    print(container.report())
+    print()
+    print(f'preguiçoso, em série: {serial * 1000:.1f} ms')
+    print(f'boot paralelo:        {elapsed * 1000:.1f} ms')
+    print(container.get('app') is container.get('app'))
+
+    # Preguiçoso com várias threads: uma única instância de cada singleton
+    from threading import Thread
+
+    container.reset()
+    apps: List = []
+    threads = [Thread(target=lambda: apps.append(container.get('app')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(all(app is apps[0] for app in apps), len(container.init_times))
@@ -0,0 +1,201 @@
+"""
+AppSettings recarregável a quente, com snapshots versionados.
+
+Em singleton_1.py o __init__ redefine tema e font a cada chamada, e as
+alterações são feitas no próprio objeto, sem nenhuma garantia de
+consistência para quem está lendo.
+
+Aqui as configurações vêm de um arquivo JSON (lido via mmap) que é
+observado por uma thread. Cada carga gera um snapshot imutável com um
+número de versão. Publicar uma nova versão é só trocar uma referência
+(uma atribuição é atômica no CPython), então:
+    - Leitores nunca usam trava: pegam "settings.current" e trabalham
+      com aquele snapshot, que nunca muda.
+    - Uma recarga não bloqueia leitores; quem pegou a versão antiga
+      continua com ela até pedir o snapshot de novo.
+
+Quem escreve o arquivo deve gravar num temporário e usar os.replace,
+para que a troca do arquivo também seja atômica. Se o arquivo estiver
+inválido (ou não for um objeto JSON), a versão atual é mantida e reload
+devolve False.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    version: int
+    tema: str = 'O tema escuro'
+    font: str = '18px'
+    extras: Mapping = field(default_factory=lambda: MappingProxyType({}))
+
+
+class AppSettings:
+    _instance = None
+    _instance_lock = Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
+        return cls._instance
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """ Ao contrário de singleton_1.py, só inicializa uma vez """
+        if self._initialized:
+            return
+        self._initialized = True
+        self.path = path
+        self.current = SettingsSnapshot(version=0)
+        self._file_id: Optional[Tuple] = None
+        self._reload_lock = Lock()
+        self._stop = Event()
+        self._watcher: Optional[Thread] = None
+        if path is not None:
+            self.reload()
+
+    def reload(self) -> bool:
+        """ Publica uma nova versão se o arquivo for válido """
+        if self.path is None:
+            return False
+        with self._reload_lock:
+            try:
+                with open(self.path, 'rb') as file:
+                    file_id = self._stat(file.fileno())
+                    with mmap.mmap(file.fileno(), 0,
+                                   access=mmap.ACCESS_READ) as data:
+                        values = json.loads(data[:])
+            except (OSError, ValueError):
+                return False
+            if not isinstance(values, dict):
+                return False
+
+            tema = values.pop('tema', SettingsSnapshot.tema)
+            font = values.pop('font', SettingsSnapshot.font)
+            # Uma única atribuição: leitores veem a versão antiga ou a
+            # nova, nunca uma mistura das duas
+            self.current = SettingsSnapshot(
+                version=self.current.version + 1,
+                tema=tema,
+                font=font,
+                extras=MappingProxyType(values),
+            )
+            self._file_id = file_id
+            return True
+
+    @staticmethod
+    def _stat(fd_or_path) -> Tuple:
+        st = os.stat(fd_or_path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            # Um erro numa volta não pode matar a thread: a próxima tenta
+            # de novo
+            try:
+                changed = (self.path is not None
+                           and self._stat(self.path) != self._file_id)
+                if changed:
+                    self.reload()
+            except Exception:
+                continue
+
+    def start_watching(self, interval: float = 0.5) -> None:
+        self._stop.clear()
+        self._watcher = Thread(target=self._watch, args=(interval,),
+                               daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    READS = 2_000_000
+    RELOAD_HZ = 100
+
+    def write_settings(path: str, counter: int) -> None:
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as file:
+            json.dump({'tema': f'tema {counter}', 'font': '18px',
+                       'counter': counter}, file)
+        os.replace(tmp, path)
+
+    def measure(settings: AppSettings):
+        latencies = []
+        versions = set()
+        clock = time.perf_counter_ns
+        for _ in range(READS):
+            start = clock()
+            snapshot = settings.current
+            snapshot.tema
+            latencies.append(clock() - start)
+            versions.add(snapshot.version)
+        latencies.sort()
+        return (
+            latencies[len(latencies) // 2],
+            latencies[int(len(latencies) * 0.99)],
+            latencies[-1],
+            len(versions),
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'settings.json')
+        write_settings(path, 0)
+
+        settings = AppSettings(path)
+        print(settings.current)
+        print(AppSettings() is settings, AppSettings().current.version)
+
+        # JSON válido que não é um objeto: mantém a versão atual
+        with open(path, 'w') as file:
+            json.dump([1, 2], file)
+        assert not settings.reload() and settings.current.version == 1
+        settings.path = None
+        assert not settings.reload()
+        settings.path = path
+        write_settings(path, 0)
+        print()
+
+        print(f'{"cenário":<24}{"p50 (ns)":>10}{"p99 (ns)":>10}'
+              f'{"máx (ns)":>12}{"versões":>10}')
+        p50, p99, worst, versions = measure(settings)
+        print(f'{"sem recargas":<24}{p50:>10}{p99:>10}{worst:>12}'
+              f'{versions:>10}')
+
+        stop = Event()
+
+        def writer() -> None:
+            counter = 1
+            while not stop.wait(1 / RELOAD_HZ):
+                write_settings(path, counter)
+                counter += 1
+
+        settings.start_watching(interval=1 / (2 * RELOAD_HZ))
+        writer_thread = Thread(target=writer)
+        writer_thread.start()
+        try:
+            p50, p99, worst, versions = measure(settings)
+        finally:
+            stop.set()
+            writer_thread.join()
+            settings.stop_watching()
+        name = f'recargas a {RELOAD_HZ} Hz'
+        print(f'{name:<24}{p50:>10}{p99:>10}{worst:>12}{versions:>10}')
@@ -0,0 +1,547 @@
+"""
+Serializadores especializados por classe para objetos como User e Person.
+
+O StringReprMixin (copiado em monostate_*.py, builder_1.py e
+prototype_1.py) percorre self.__dict__ e monta f-strings a cada chamada.
+Para milhões de objetos esse trabalho genérico se repete sempre igual.
+
+Aqui, na primeira vez que uma classe é serializada, os nomes dos campos
+são lidos da instância e um encoder específico para aquela classe é
+gerado (com exec), já com os nomes dos campos e os separadores fixos no
+código. Existem três formatos:
+    repr: o mesmo texto do StringReprMixin
+    json: o mesmo texto de json.dumps(obj.__dict__)
+    binary: formato compacto, com o esquema (classe e campos) escrito uma
+        única vez por stream e os registros só com os valores
+
+dump_many escreve direto num stream com buffer. No formato binário os
+registros são acumulados num único bytearray, sem objetos intermediários
+por registro.
+
+Se uma instância tiver campos diferentes dos da primeira instância vista,
+ela é serializada pelo caminho genérico, assim como classes cujos nomes
+(ou de seus campos) não são identificadores Python. Se um registro
+binário falhar no meio, o que ele escreveu (inclusive esquemas de objetos
+aninhados) é desfeito antes de a exceção subir.
+"""
+import struct
+from json import dumps
+from json.encoder import encode_basestring_ascii
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+SCHEMA_TAG = b'S'
+OBJECT_TAG = b'o'
+DICT_TAG = b'd'
+MAP_TAG = b'm'
+BIGINT_TAG = b'I'
+
+_u16 = struct.Struct('<H')
+_u32 = struct.Struct('<I')
+_i64 = struct.Struct('<q')
+_f64 = struct.Struct('<d')
+# Tag 's' e tamanho de um texto num único pack
+_str_head = struct.Struct('<cI')
+_U16_MAX = 0xFFFF
+
+
+def _json_value(value) -> str:
+    """ Atalho para os tipos comuns, evitando o custo fixo de dumps """
+    kind = type(value)
+    if kind is str:
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if kind is int:
+        return int.__repr__(value)
+    if kind is list:
+        return '[' + ', '.join([_json_value(item) for item in value]) + ']'
+    return dumps(value)
+
+
+def _literal(text: str) -> str:
+    """ Texto fixo dentro de um f'''...''' gerado """
+    return (text.replace('\\', '\\\\').replace("'", "\\'")
+            .replace('{', '{{').replace('}', '}}'))
+
+
+def _not_compiled(*args):
+    raise KeyError
+
+
+class ClassSerializer:
+    """ Encoders gerados para uma classe e um conjunto de campos """
+
+    def __init__(self, cls: type, fields: Tuple[str, ...],
+                 schema_id: int) -> None:
+        self.cls = cls
+        self.fields = fields
+        self.schema_id = schema_id
+        # Só nomes que são identificadores entram no código gerado; com
+        # outros (ex.: "it's") as instâncias vão pelo caminho genérico
+        self.compiled = all(
+            name.isidentifier() for name in (cls.__name__, *fields)
+        )
+        # O id do esquema vai num u16 no formato binário
+        self.binary = self.compiled and schema_id <= _U16_MAX
+        if self.compiled:
+            self.encode_repr = self._compile_repr()
+            self.encode_json = self._compile_json()
+            self.encode_binary = self._compile_binary()
+        else:
+            self.encode_repr = self.encode_json = _not_compiled
+            self.encode_binary = _not_compiled
+
+    def _compile(self, source: str, namespace: Dict) -> Callable:
+        namespace['FIELDS'] = frozenset(self.fields)
+        exec(source, namespace)
+        return namespace['encode']
+
+    def _guard(self) -> str:
+        # Instâncias com outros campos caem no KeyError (caminho genérico)
+        # antes de qualquer coisa ser escrita
+        return (
+            '    d = obj.__dict__\n'
+            '    if d.keys() != FIELDS:\n'
+            '        raise KeyError\n'
+        )
+
+    def _compile_repr(self) -> Callable:
+        params = ', '.join(
+            f'{_literal(f)}={{d[{f!r}]}}' for f in self.fields
+        )
+        name = _literal(self.cls.__name__)
+        source = (
+            'def encode(obj):\n'
+            f'{self._guard()}'
+            f"    return f'''{name}({params})'''\n"
+        )
+        return self._compile(source, {})
+
+    def _compile_json(self) -> Callable:
+        params = ', '.join(
+            f'{_literal(dumps(f))}: {{value(d[{f!r}])}}' for f in self.fields
+        )
+        source = (
+            'def encode(obj):\n'
+            f'{self._guard()}'
+            f"    return f'''{{{{{params}}}}}'''\n"
+        )
+        return self._compile(source, {'value': _json_value})
+
+    def _compile_binary(self) -> Callable:
+        # Textos e None, os valores mais comuns, são escritos ali mesmo;
+        # o resto passa por BinaryWriter.value
+        lines = [
+            f'    v = d[{f!r}]\n'
+            '    if v.__class__ is str:\n'
+            '        data = v.encode()\n'
+            "        out += STR_HEAD(b's', len(data))\n"
+            '        out += data\n'
+            '    elif v is None:\n'
+            "        out += b'N'\n"
+            '    else:\n'
+            '        value(v, out)\n'
+            for f in self.fields
+        ]
+        source = (
+            'def encode(obj, out, value):\n'
+            f'{self._guard()}'
+            '    out += PREFIX\n'
+            f'{"".join(lines)}'
+        )
+        prefix = OBJECT_TAG + _u16.pack(self.schema_id)
+        return self._compile(source, {'PREFIX': prefix,
+                                      'STR_HEAD': _str_head.pack})
+
+    def schema_bytes(self) -> bytes:
+        out = bytearray(SCHEMA_TAG)
+        out += _u16.pack(self.schema_id)
+        out += _u16.pack(len(self.fields))
+        for text in (self.cls.__name__, *self.fields):
+            _write_str(text, out)
+        return bytes(out)
+
+
+_serializers: Dict[type, ClassSerializer] = {}
+_serializers_lock = Lock()
+
+
+def serializer_for(obj) -> ClassSerializer:
+    cls = type(obj)
+    serializer = _serializers.get(cls)
+    if serializer is None:
+        # Sob a trava: duas threads não podem pegar o mesmo schema_id
+        with _serializers_lock:
+            serializer = _serializers.get(cls)
+            if serializer is None:
+                serializer = ClassSerializer(cls, tuple(obj.__dict__),
+                                             len(_serializers))
+                _serializers[cls] = serializer
+    return serializer
+
+
+def to_repr(obj) -> str:
+    try:
+        return serializer_for(obj).encode_repr(obj)
+    except KeyError:
+        params = ', '.join([f'{k}={v}' for k, v in obj.__dict__.items()])
+        return f'{obj.__class__.__name__}({params})'
+
+
+def to_json(obj) -> str:
+    try:
+        return serializer_for(obj).encode_json(obj)
+    except KeyError:
+        return dumps(obj.__dict__)
+
+
+def _write_str(text: str, out: bytearray) -> None:
+    data = text.encode()
+    out += _u32.pack(len(data))
+    out += data
+
+
+class BinaryWriter:
+    """ Acumula registros binários e escreve o esquema uma vez por stream """
+
+    def __init__(self, stream, chunk_size: int = 1 << 16) -> None:
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._out = bytearray()
+        self._written_schemas: set = set()
+        # Ordem em que os esquemas foram escritos, para desfazer
+        self._schema_log: List[int] = []
+
+    def value(self, value, out: bytearray) -> None:
+        if value is None:
+            out += b'N'
+        elif value is True:
+            out += b'T'
+        elif value is False:
+            out += b'F'
+        elif type(value) is int:
+            try:
+                packed = _i64.pack(value)
+            except struct.error:
+                out += BIGINT_TAG
+                data = value.to_bytes(value.bit_length() // 8 + 1,
+                                      'little', signed=True)
+                out += _u32.pack(len(data))
+                out += data
+            else:
+                out += b'i'
+                out += packed
+        elif type(value) is float:
+            out += b'f'
+            out += _f64.pack(value)
+        elif type(value) is str:
+            data = value.encode()
+            out += _str_head.pack(b's', len(data))
+            out += data
+        elif isinstance(value, (list, tuple)):
+            out += b'l'
+            out += _u32.pack(len(value))
+            for item in value:
+                if type(item) is str:
+                    data = item.encode()
+                    out += _str_head.pack(b's', len(data))
+                    out += data
+                else:
+                    self.value(item, out)
+        elif isinstance(value, dict):
+            out += MAP_TAG
+            out += _u32.pack(len(value))
+            for key, item in value.items():
+                self.value(key, out)
+                self.value(item, out)
+        elif hasattr(value, '__dict__'):
+            self.record(value, out)
+        else:
+            out += b's'
+            _write_str(str(value), out)
+
+    def record(self, obj, out: bytearray) -> None:
+        serializer = serializer_for(obj)
+        if serializer.binary and \
+                serializer.schema_id not in self._written_schemas:
+            self._written_schemas.add(serializer.schema_id)
+            self._schema_log.append(serializer.schema_id)
+            out += serializer.schema_bytes()
+
+        mark = len(out)
+        logged = len(self._schema_log)
+        try:
+            try:
+                if not serializer.binary:
+                    raise KeyError
+                serializer.encode_binary(obj, out, self.value)
+            except KeyError:
+                self._rollback(out, mark, logged)
+                out += DICT_TAG
+                _write_str(obj.__class__.__name__, out)
+                out += _u16.pack(len(obj.__dict__))
+                for key, value in obj.__dict__.items():
+                    _write_str(key, out)
+                    self.value(value, out)
+        except BaseException:
+            self._rollback(out, mark, logged)
+            raise
+
+    def _rollback(self, out: bytearray, mark: int, logged: int) -> None:
+        # Os esquemas escritos depois de mark somem junto com os bytes
+        del out[mark:]
+        for schema_id in self._schema_log[logged:]:
+            self._written_schemas.discard(schema_id)
+        del self._schema_log[logged:]
+
+    def write(self, obj) -> None:
+        self.record(obj, self._out)
+        if len(self._out) >= self._chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self._stream.write(self._out)
+        self._out.clear()
+
+
+def dump_many(objects: Iterable, stream, fmt: str = 'repr') -> None:
+    """ repr e json: stream de texto, um objeto por linha """
+    if fmt == 'binary':
+        writer = BinaryWriter(stream)
+        for obj in objects:
+            writer.write(obj)
+        writer.flush()
+        return
+
+    assert fmt in ('repr', 'json'), 'Formato não existe'
+    generic = to_repr if fmt == 'repr' else to_json
+    write = stream.write
+    cls = encode = None
+    for obj in objects:
+        if type(obj) is not cls:
+            cls = type(obj)
+            serializer = serializer_for(obj)
+            encode = (serializer.encode_repr if fmt == 'repr'
+                      else serializer.encode_json)
+        try:
+            write(encode(obj))
+        except KeyError:
+            write(generic(obj))
+        write('\n')
+
+
+def load_binary(data: bytes) -> Iterator[Tuple[str, Dict]]:
+    """ Lê o formato binário e devolve (nome da classe, campos) """
+    schemas: Dict[int, Tuple[str, List[str]]] = {}
+    view = memoryview(data)
+
+    def read_str(pos: int) -> Tuple[str, int]:
+        size, = _u32.unpack_from(view, pos)
+        pos += 4
+        return str(view[pos:pos + size], 'utf-8'), pos + size
+
+    def read_value(pos: int):
+        tag = view[pos:pos + 1].tobytes()
+        pos += 1
+        if tag == SCHEMA_TAG:
+            schema_id, count = struct.unpack_from('<HH', view, pos)
+            pos += 4
+            name, pos = read_str(pos)
+            fields = []
+            for _ in range(count):
+                field, pos = read_str(pos)
+                fields.append(field)
+            schemas[schema_id] = (name, fields)
+            return read_value(pos)
+        if tag == b'N':
+            return None, pos
+        if tag == b'T':
+            return True, pos
+        if tag == b'F':
+            return False, pos
+        if tag == b'i':
+            return _i64.unpack_from(view, pos)[0], pos + 8
+        if tag == BIGINT_TAG:
+            size, = _u32.unpack_from(view, pos)
+            pos += 4
+            data = view[pos:pos + size]
+            return int.from_bytes(data, 'little', signed=True), pos + size
+        if tag == b'f':
+            return _f64.unpack_from(view, pos)[0], pos + 8
+        if tag == b's':
+            return read_str(pos)
+        if tag == b'l':
+            count, = _u32.unpack_from(view, pos)
+            pos += 4
+            items = []
+            for _ in range(count):
+                item, pos = read_value(pos)
+                items.append(item)
+            return items, pos
+        if tag == MAP_TAG:
+            count, = _u32.unpack_from(view, pos)
+            pos += 4
+            mapping = {}
+            for _ in range(count):
+                key, pos = read_value(pos)
+                if type(key) is list:
+                    key = tuple(key)
+                mapping[key], pos = read_value(pos)
+            return mapping, pos
+        if tag == OBJECT_TAG:
+            schema_id, = _u16.unpack_from(view, pos)
+            pos += 2
+            name, fields = schemas[schema_id]
+            values = {}
+            for field in fields:
+                values[field], pos = read_value(pos)
+            return (name, values), pos
+        if tag == DICT_TAG:
+            name, pos = read_str(pos)
+            count, = _u16.unpack_from(view, pos)
+            pos += 2
+            values = {}
+            for _ in range(count):
+                key, pos = read_str(pos)
+                values[key], pos = read_value(pos)
+            return (name, values), pos
+        raise ValueError(f'Tag desconhecida: {tag!r}')
+
+    pos = 0
+    while pos < len(view):
+        record, pos = read_value(pos)
+        yield record
+
+
+class SerializerMixin:
+    """ Substitui o StringReprMixin usando o encoder gerado """
+
+    def __str__(self) -> str:
+        return to_repr(self)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+if __name__ == "__main__":
+    import io
+    import json
+    import os
+    import pickle
+    import time
+
+    from builder_1 import UserBuilder, UserDirector
+
+    N_USERS = 1_000_000
+
+    builder = UserBuilder()
+    director = UserDirector(builder)
+    users = []
+    for i in range(N_USERS):
+        builder.add_phone_number(f'+55 11 9{i:08d}')
+        users.append(director.with_address(f'Nome{i}', f'Sobrenome{i}',
+                                           f'Rua {i}, {i % 1000}'))
+
+    assert to_repr(users[0]) == str(users[0])
+    assert to_json(users[0]) == json.dumps(users[0].__dict__)
+    buffer = io.BytesIO()
+    dump_many(users[:3], buffer, 'binary')
+    assert [v for _, v in load_binary(buffer.getvalue())] == \
+        [u.__dict__ for u in users[:3]]
+
+    class Sensor:
+        def __init__(self, **fields) -> None:
+            self.__dict__.update(fields)
+
+    class Reading(Sensor):
+        pass
+
+    class Broken:
+        __slots__ = ()
+
+        def __str__(self) -> str:
+            raise TypeError('sem representação')
+
+    buffer = io.BytesIO()
+    writer = BinaryWriter(buffer)
+    writer.write(Sensor(id=1 << 70, tags={'a': 1, 2: [3]}))
+    writer.write(Sensor(nome=-(1 << 80), extra=None))
+    try:
+        # Falha no meio: o esquema do Sensor aninhado não pode se perder
+        writer.write(Sensor(id=Reading(valor=1), tags=Broken()))
+    except TypeError:
+        pass
+    writer.write(Sensor(id=Reading(valor=2), tags=None))
+    writer.flush()
+    assert [v for _, v in load_binary(buffer.getvalue())] == [
+        {'id': 1 << 70, 'tags': {'a': 1, 2: [3]}},
+        {'nome': -(1 << 80), 'extra': None},
+        {'id': ('Reading', {'valor': 2}), 'tags': None},
+    ]
+
+    # Nomes que não são identificadores não entram no código gerado
+    odd = Sensor(**{"it's": 1, 'a{len("zz")}': 'x'})
+    assert to_repr(odd) == 'Sensor(it\'s=1, a{len("zz")}=x)'
+    assert to_json(odd) == json.dumps(odd.__dict__)
+    buffer = io.BytesIO()
+    dump_many([odd], buffer, 'binary')
+    assert [v for _, v in load_binary(buffer.getvalue())] == [odd.__dict__]
+    print(to_repr(users[0]))
+    print(to_json(users[0]))
+    print()
+
+    def bench(name: str, func: Callable) -> None:
+        with open(os.devnull, 'wb') as raw:
+            start = time.perf_counter()
+            func(raw)
+            elapsed = time.perf_counter() - start
+        print(f'{name:<36}{elapsed:>10.2f}{N_USERS / elapsed:>16,.0f}')
+
+    def text(raw):
+        return io.TextIOWrapper(io.BufferedWriter(raw), encoding='utf-8')
+
+    def mixin_repr(raw) -> None:
+        stream = text(raw)
+        for user in users:
+            stream.write(str(user))
+            stream.write('\n')
+        stream.flush()
+
+    def mixin_json(raw) -> None:
+        stream = text(raw)
+        for user in users:
+            stream.write(json.dumps(user.__dict__))
+            stream.write('\n')
+        stream.flush()
+
+    def generated(fmt: str) -> Callable:
+        def run(raw) -> None:
+            if fmt == 'binary':
+                stream = io.BufferedWriter(raw)
+                dump_many(users, stream, fmt)
+            else:
+                stream = text(raw)
+                dump_many(users, stream, fmt)
+            stream.flush()
+        return run
+
+    def pickled(raw) -> None:
+        stream = io.BufferedWriter(raw)
+        pickler = pickle.Pickler(stream, protocol=5)
+        for user in users:
+            pickler.dump(user.__dict__)
+        stream.flush()
+
+    print(f'{N_USERS:,} objetos User')
+    print(f'{"serializador":<36}{"s":>10}{"objetos/s":>16}')
+    bench('StringReprMixin.__str__', mixin_repr)
+    bench('gerado: repr', generated('repr'))
+    bench('json.dumps(obj.__dict__)', mixin_json)
+    bench('gerado: json', generated('json'))
+    bench('pickle (protocolo 5) do __dict__', pickled)
+    bench('gerado: binary', generated('binary'))
+
+    buffer = io.BytesIO()
+    dump_many(users, buffer, 'binary')
+    print(f'\nbinary: {len(buffer.getvalue()) / N_USERS:.1f} bytes/objeto')
@@ -0,0 +1,291 @@
+"""
+Builder em lote, com os campos guardados em colunas.
+
+O UserBuilder de builder_1.py cria um objeto User completo, com duas
+listas, para cada registro, e a propriedade result reinicia o builder a
+cada usuário. Com dezenas de milhões de usuários, o custo é dominado
+pelos objetos: cada User tem um __dict__ e duas listas próprias.
+
+O UserBatchBuilder mantém a mesma interface de métodos encadeados, mas
+grava cada campo numa coluna (struct-of-arrays):
+    - firstname e lastname em listas, age num array('q') de inteiros e
+      uma máscara (bytearray) que diz se a idade foi informada.
+    - phone_numbers e addresses em um array de valores mais um array de
+      deslocamentos (offsets), como nas colunas de listas do Arrow.
+    - next_user() fecha o usuário atual e começa o próximo.
+
+O lote só cria objetos User quando uma linha é acessada (lote[i]) e pode
+exportar as colunas para NumPy (se estiver instalado) com to_numpy().
+Cada acesso monta um User novo, uma cópia da linha: alterar esse User
+não altera o lote, e a alteração se perde.
+
+A idade é convertida e validada antes de qualquer coluna ser alterada,
+então um valor inválido (inclusive negativo) gera ValueError sem
+desalinhar as colunas.
+"""
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from builder_1 import IUserBuilder, User
+
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _to_age(age) -> Optional[int]:
+    """ Aceita int, texto ('31') ou float inteiro (31.0) """
+    if age is None:
+        return None
+    try:
+        if isinstance(age, str):
+            age = int(age.strip())
+        elif isinstance(age, float):
+            if not age.is_integer():
+                raise ValueError
+            age = int(age)
+        else:
+            age = int(age)
+    except (TypeError, ValueError):
+        raise ValueError(f'Idade inválida: {age!r}') from None
+    if age < 0:
+        raise ValueError(f'Idade negativa: {age!r}')
+    if age > _INT64_MAX:
+        raise ValueError(f'Idade fora do intervalo: {age!r}')
+    return age
+
+
+class UserBatch:
+    """ Colunas de um lote de usuários """
+
+    def __init__(self, firstnames: List, lastnames: List, ages: array,
+                 has_age: bytearray,
+                 phone_numbers: List, phone_offsets: array,
+                 addresses: List, address_offsets: array) -> None:
+        self.firstnames = firstnames
+        self.lastnames = lastnames
+        self.ages = ages
+        self.has_age = has_age
+        self.phone_numbers = phone_numbers
+        self.phone_offsets = phone_offsets
+        self.addresses = addresses
+        self.address_offsets = address_offsets
+
+    def __len__(self) -> int:
+        return len(self.firstnames)
+
+    def __getitem__(self, index: int) -> User:
+        """
+        Monta o User só quando a linha é acessada. É um objeto novo a cada
+        acesso: alterações nele não voltam para o lote.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('Usuário fora do lote')
+
+        user = User()
+        user.firstname = self.firstnames[index]
+        user.lastname = self.lastnames[index]
+        user.age = self.ages[index] if self.has_age[index] else None
+        user.phone_numbers = self.phone_numbers[
+            self.phone_offsets[index]:self.phone_offsets[index + 1]
+        ]
+        user.addresses = self.addresses[
+            self.address_offsets[index]:self.address_offsets[index + 1]
+        ]
+        return user
+
+    def __iter__(self) -> Iterator[User]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_numpy(self) -> Dict:
+        """ Exporta as colunas como arrays NumPy (requer numpy) """
+        try:
+            import numpy as np
+        except ImportError as error:
+            raise ImportError('to_numpy precisa do numpy instalado') \
+                from error
+
+        return {
+            'firstname': np.array(self.firstnames, dtype=object),
+            'lastname': np.array(self.lastnames, dtype=object),
+            'age': np.ma.array(
+                np.frombuffer(self.ages, dtype=np.int64),
+                mask=np.frombuffer(self.has_age, dtype=np.uint8) == 0,
+            ),
+            'phone_numbers': np.array(self.phone_numbers, dtype=object),
+            'phone_offsets': np.frombuffer(self.phone_offsets,
+                                           dtype=np.int64),
+            'addresses': np.array(self.addresses, dtype=object),
+            'address_offsets': np.frombuffer(self.address_offsets,
+                                             dtype=np.int64),
+        }
+
+
+class UserBatchBuilder(IUserBuilder):
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._firstnames: List = []
+        self._lastnames: List = []
+        self._ages = array('q')
+        self._has_age = bytearray()
+        self._phone_numbers: List = []
+        self._phone_offsets = array('q', [0])
+        self._addresses: List = []
+        self._address_offsets = array('q', [0])
+        self._open = False
+
+    def _ensure_open(self) -> None:
+        # Abre uma nova linha com os valores padrão de User
+        if not self._open:
+            self._firstnames.append(None)
+            self._lastnames.append(None)
+            self._ages.append(0)
+            self._has_age.append(0)
+            self._open = True
+
+    @property
+    def result(self) -> UserBatch:
+        """ Fecha o lote e começa um novo (como o result de builder_1) """
+        if self._open:
+            self.next_user()
+        batch = UserBatch(
+            self._firstnames, self._lastnames, self._ages, self._has_age,
+            self._phone_numbers, self._phone_offsets,
+            self._addresses, self._address_offsets,
+        )
+        self.reset()
+        return batch
+
+    def next_user(self) -> 'UserBatchBuilder':
+        self._ensure_open()
+        self._phone_offsets.append(len(self._phone_numbers))
+        self._address_offsets.append(len(self._addresses))
+        self._open = False
+        return self
+
+    def add_firstname(self, firstname) -> 'UserBatchBuilder':
+        self._ensure_open()
+        self._firstnames[-1] = firstname
+        return self
+
+    def add_lastname(self, lastname) -> 'UserBatchBuilder':
+        self._ensure_open()
+        self._lastnames[-1] = lastname
+        return self
+
+    def add_age(self, age: Optional[int]) -> 'UserBatchBuilder':
+        age = _to_age(age)
+        self._ensure_open()
+        self._ages[-1] = 0 if age is None else age
+        self._has_age[-1] = age is not None
+        return self
+
+    def add_phone_number(self, phone_number) -> 'UserBatchBuilder':
+        self._ensure_open()
+        self._phone_numbers.append(phone_number)
+        return self
+
+    def add_address(self, address) -> 'UserBatchBuilder':
+        self._ensure_open()
+        self._addresses.append(address)
+        return self
+
+    def add_user(self, firstname, lastname, age: Optional[int] = None,
+                 phone_numbers=(), addresses=()) -> 'UserBatchBuilder':
+        """ Atalho para gravar uma linha inteira de uma vez """
+        # Converte tudo antes de mexer nas colunas
+        age = _to_age(age)
+        phone_numbers = list(phone_numbers)
+        addresses = list(addresses)
+        if self._open:
+            self.next_user()
+        self._firstnames.append(firstname)
+        self._lastnames.append(lastname)
+        self._ages.append(0 if age is None else age)
+        self._has_age.append(age is not None)
+        self._phone_numbers.extend(phone_numbers)
+        self._phone_offsets.append(len(self._phone_numbers))
+        self._addresses.extend(addresses)
+        self._address_offsets.append(len(self._addresses))
+        return self
+
+
+if __name__ == "__main__":
+    import gc
+    import time
+    import tracemalloc
+
+    from builder_1 import UserBuilder
+
+    N_USERS = 1_000_000
+
+    batch_builder = UserBatchBuilder()
+    batch_builder.add_firstname('Robert').add_lastname('Cruz').add_age(35)
+    batch_builder.next_user()
+    batch_builder.add_firstname('Luiz').add_address('123 Main St')
+    batch_builder.add_user('Ana', 'Cruz', '31', addresses=['Rua A'])
+    for idade in ('trinta', -1):
+        try:
+            batch_builder.add_user('Rui', 'Cruz', idade)
+        except ValueError as error:
+            print('ValueError:', error)
+    lote = batch_builder.result
+    assert len(lote) == 3
+    for user in lote:
+        print(user)
+    print()
+
+    def with_builder() -> List:
+        builder = UserBuilder()
+        return [
+            builder.add_firstname(f'Nome{i}').add_lastname('Cruz')
+            .add_age(i % 90).add_phone_number('+55 11 90000-0000')
+            .result
+            for i in range(N_USERS)
+        ]
+
+    def with_batch_chained() -> UserBatch:
+        builder = UserBatchBuilder()
+        for i in range(N_USERS):
+            builder.add_firstname(f'Nome{i}').add_lastname('Cruz') \
+                .add_age(i % 90).add_phone_number('+55 11 90000-0000') \
+                .next_user()
+        return builder.result
+
+    def with_batch_rows() -> UserBatch:
+        builder = UserBatchBuilder()
+        phones = ('+55 11 90000-0000',)
+        for i in range(N_USERS):
+            builder.add_user(f'Nome{i}', 'Cruz', i % 90, phones)
+        return builder.result
+
+    print(f'{N_USERS:,} usuários')
+    print(f'{"builder":<28}{"usuários/s":>14}{"bytes/usuário":>16}')
+    for name, build in [('UserBuilder (builder_1)', with_builder),
+                        ('UserBatchBuilder encadeado', with_batch_chained),
+                        ('UserBatchBuilder.add_user', with_batch_rows)]:
+        gc.collect()
+        start = time.perf_counter()
+        result = build()
+        elapsed = time.perf_counter() - start
+        del result
+
+        gc.collect()
+        tracemalloc.start()
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        print(f'{name:<28}{N_USERS / elapsed:>14,.0f}'
+              f'{current / N_USERS:>16.1f}')
+
+    try:
+        colunas = with_batch_rows().to_numpy()
+        print()
+        print('idade média (NumPy):', colunas['age'].mean())
+    except ImportError as error:
+        print()
+        print(error)
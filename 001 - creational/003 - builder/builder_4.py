@@ -0,0 +1,150 @@
+"""
+Planos de construção gravados a partir do UserDirector.
+
+UserDirector.with_age e with_address, em builder_1.py, fazem sempre a
+mesma sequência de chamadas encadeadas no builder. Para cada usuário são
+várias chamadas de método, mais o result que reinicia o builder.
+
+Aqui a receita do director é gravada uma única vez: o director é
+executado com um builder "gravador" e argumentos simbólicos, e cada
+chamada vira um passo (campo, operação, argumento). Os passos ficam em
+plan.steps e são compilados numa função gerada que cria o User e
+atribui os campos diretamente, sem passar pelo builder.
+
+plan.replay(linhas) aplica essa função a um iterável de tuplas de
+argumentos (na ordem dos parâmetros do método do director).
+"""
+import inspect
+from itertools import starmap
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from builder_1 import User, UserDirector
+
+# Método do builder -> (operação, campo de User)
+BUILDER_STEPS = {
+    'add_firstname': ('set', 'firstname'),
+    'add_lastname': ('set', 'lastname'),
+    'add_age': ('set', 'age'),
+    'add_phone_number': ('append', 'phone_numbers'),
+    'add_address': ('append', 'addresses'),
+}
+
+
+class Argument:
+    """ Marca o lugar de um argumento do director durante a gravação """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f'Argument({self.name!r})'
+
+
+class RecordingBuilder:
+    def __init__(self) -> None:
+        self.steps: List[Tuple[str, str, object]] = []
+
+    def __getattr__(self, method: str) -> Callable:
+        if method not in BUILDER_STEPS:
+            raise AttributeError(method)
+        operation, field = BUILDER_STEPS[method]
+
+        def record(value):
+            self.steps.append((operation, field, value))
+            return self
+
+        return record
+
+    @property
+    def result(self) -> None:
+        return None
+
+
+class BuildPlan:
+    def __init__(self, params: List[str],
+                 steps: List[Tuple[str, str, object]]) -> None:
+        self.params = params
+        self.steps = steps
+        self.build = self._compile()
+
+    @classmethod
+    def record(cls, director_method: Callable) -> 'BuildPlan':
+        """ Grava, por exemplo, BuildPlan.record(UserDirector.with_age) """
+        params = list(inspect.signature(director_method).parameters)[1:]
+        recorder = RecordingBuilder()
+        director_method(UserDirector(recorder),
+                        *[Argument(name) for name in params])
+        return cls(params, recorder.steps)
+
+    def _compile(self) -> Callable:
+        """
+        Gera uma função que monta o __dict__ do User de uma vez, na mesma
+        ordem de campos do User(), sem chamar o __init__ nem o builder.
+        """
+        namespace = {'User': User, 'new': object.__new__}
+        sets, appends = {}, {}
+        for index, (operation, field, value) in enumerate(self.steps):
+            if isinstance(value, Argument):
+                expression = value.name
+            else:
+                # Valores fixos da receita entram como constantes
+                expression = f'_const{index}'
+                namespace[expression] = value
+            if operation == 'set':
+                sets[field] = expression
+            else:
+                appends.setdefault(field, []).append(expression)
+
+        lines = [f'def build({", ".join(self.params)}):',
+                 '    user = new(User)']
+        for field, default in vars(User()).items():
+            if field in sets:
+                expression = sets[field]
+            elif isinstance(default, list):
+                expression = f'[{", ".join(appends.get(field, []))}]'
+            else:
+                expression = f'_default_{field}'
+                namespace[expression] = default
+            lines.append(f'    user.{field} = {expression}')
+        lines.append('    return user')
+
+        exec('\n'.join(lines) + '\n', namespace)
+        return namespace['build']
+
+    def replay(self, rows: Iterable[Tuple]) -> Iterator[User]:
+        return starmap(self.build, rows)
+
+
+if __name__ == "__main__":
+    import time
+
+    from builder_1 import UserBuilder
+
+    N_USERS = 1_000_000
+
+    with_age = BuildPlan.record(UserDirector.with_age)
+    with_address = BuildPlan.record(UserDirector.with_address)
+    print(with_age.steps)
+    print(list(with_age.replay([('Robert', 'Cruz', 35)])))
+    print(list(with_address.replay([('Robert', 'Cruz', '123 Main St')])))
+    print()
+
+    rows = [(f'Nome{i}', 'Cruz', i % 90) for i in range(N_USERS)]
+
+    def director_loop() -> List:
+        director = UserDirector(UserBuilder())
+        return [director.with_age(*row) for row in rows]
+
+    def plan_replay() -> List:
+        return list(with_age.replay(rows))
+
+    assert str(director_loop()[:3]) == str(plan_replay()[:3])
+
+    print(f'{N_USERS:,} usuários')
+    print(f'{"modo":<28}{"s":>8}{"usuários/s":>14}')
+    for name, func in [('UserDirector.with_age', director_loop),
+                       ('BuildPlan.replay', plan_replay)]:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(f'{name:<28}{elapsed:>8.2f}{N_USERS / elapsed:>14,.0f}')
@@ -0,0 +1,242 @@
+"""
+Pipeline em streaming para alimentar o UserBuilder a partir de CSV/JSONL.
+
+Carregar o arquivo inteiro antes de construir os usuários faz a memória
+crescer junto com o arquivo. Aqui tudo é feito com geradores:
+    read_records: lê o arquivo em blocos de linhas e produz um dicionário
+        por registro (CSV ou JSONL).
+    build_users: usa o UserBuilder para construir um User por registro,
+        sob demanda.
+    direct_users: o mesmo, mas com um método do UserDirector.
+
+Com workers > 0, a interpretação dos registros roda num pool de
+processos, que recebe blocos de linhas cruas. No CSV, o processo
+principal só conta as aspas de cada linha para não cortar um bloco no
+meio de um campo entre aspas com quebra de linha; o csv.reader roda nos
+workers. No JSONL, cada linha já é um registro. Só "workers * 2" blocos
+ficam em andamento ao mesmo tempo e os resultados saem na ordem do
+arquivo, então a memória continua limitada.
+
+No CSV, phone_numbers e addresses são separados por ";". No JSONL são
+listas.
+"""
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from builder_1 import User, UserBuilder
+
+FIELDS = ['firstname', 'lastname', 'age', 'phone_numbers', 'addresses']
+
+
+def _parse_csv(rows: List[List[str]]) -> List[Dict]:
+    records = []
+    for row in rows:
+        record = dict(zip(FIELDS, row))
+        for field in ('phone_numbers', 'addresses'):
+            value = record.get(field)
+            record[field] = value.split(';') if value else []
+        records.append(record)
+    return records
+
+
+def _parse_csv_lines(lines: List[str]) -> List[Dict]:
+    return _parse_csv(csv.reader(lines))
+
+
+def _parse_jsonl(lines: List[str]) -> List[Dict]:
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def _chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _csv_line_chunks(lines: Iterable[str],
+                     chunk_lines: int) -> Iterator[List[str]]:
+    """
+    Blocos de linhas que só terminam entre registros: com um número ímpar
+    de aspas até ali, um campo entre aspas continua na próxima linha
+    """
+    chunk: List[str] = []
+    quotes = 0
+    for line in lines:
+        chunk.append(line)
+        quotes += line.count('"')
+        if len(chunk) >= chunk_lines and not quotes & 1:
+            yield chunk
+            chunk = []
+            quotes = 0
+    if chunk:
+        yield chunk
+
+
+def read_records(path: str, fmt: Optional[str] = None,
+                 chunk_lines: int = 10_000,
+                 workers: int = 0) -> Iterator[Dict]:
+    """
+    fmt é 'csv' ou 'jsonl'; se omitido, vem da extensão do arquivo.
+    chunk_lines é a quantidade de registros por bloco.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.')
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f'Formato não existe: {fmt!r}')
+
+    with open(path, newline='' if fmt == 'csv' else None,
+              encoding='utf-8') as file:
+        if fmt == 'jsonl':
+            parse = _parse_jsonl
+            chunks = _chunks(file, chunk_lines)
+        else:
+            header = next(csv.reader(file), None)
+            if header != FIELDS:
+                raise ValueError(f'Cabeçalho esperado: {FIELDS}, '
+                                 f'encontrado: {header}')
+            if workers:
+                parse = _parse_csv_lines
+                chunks = _csv_line_chunks(file, chunk_lines)
+            else:
+                parse = _parse_csv
+                chunks = _chunks(csv.reader(file), chunk_lines)
+
+        if not workers:
+            for lines in chunks:
+                yield from parse(lines)
+            return
+
+        with ProcessPoolExecutor(workers) as executor:
+            pending: deque = deque()
+            for lines in chunks:
+                pending.append(executor.submit(parse, lines))
+                # Limita os blocos em andamento e mantém a ordem
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+
+def build_users(records: Iterable[Dict],
+                builder: Optional[UserBuilder] = None) -> Iterator[User]:
+    builder = builder or UserBuilder()
+    for record in records:
+        builder.add_firstname(record.get('firstname'))
+        builder.add_lastname(record.get('lastname'))
+        age = record.get('age')
+        builder.add_age(int(age) if age not in (None, '') else None)
+        for phone_number in record.get('phone_numbers', ()):
+            builder.add_phone_number(phone_number)
+        for address in record.get('addresses', ()):
+            builder.add_address(address)
+        yield builder.result
+
+
+def direct_users(records: Iterable[Dict], director_method) -> Iterator[User]:
+    """
+    Constrói cada usuário com um método do UserDirector, passando os
+    campos do registro como argumentos nomeados.
+    Ex.: direct_users(records, UserDirector(UserBuilder()).with_age)
+    """
+    for record in records:
+        yield director_method(**record)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import resource
+    import tempfile
+    import time
+
+    from builder_1 import UserDirector
+
+    SIZES = [100_000, 300_000, 900_000]
+
+    def write_files(directory: str, n_users: int) -> Dict[str, str]:
+        csv_path = os.path.join(directory, f'users_{n_users}.csv')
+        jsonl_path = os.path.join(directory, f'users_{n_users}.jsonl')
+        with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file, \
+                open(jsonl_path, 'w', encoding='utf-8') as jsonl_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(FIELDS)
+            for i in range(n_users):
+                phones = [f'+55 11 9{i:08d}']
+                addresses = [f'Rua {i}, {i % 1000}', 'Av. Brasil, 250']
+                writer.writerow([f'Nome{i}', 'Cruz', i % 90,
+                                 ';'.join(phones), ';'.join(addresses)])
+                json.dump({'firstname': f'Nome{i}', 'lastname': 'Cruz',
+                           'age': i % 90, 'phone_numbers': phones,
+                           'addresses': addresses}, jsonl_file)
+                jsonl_file.write('\n')
+        return {'csv': csv_path, 'jsonl': jsonl_path}
+
+    def consume(path: str, workers: int, load_all: bool, queue) -> None:
+        start = time.perf_counter()
+        users = build_users(read_records(path, workers=workers))
+        if load_all:
+            count = len(list(users))
+        else:
+            count = sum(1 for _ in users)
+        elapsed = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        queue.put((count, elapsed, peak_mb))
+
+    def measure(path: str, workers: int, load_all: bool):
+        # Cada medição roda num processo novo para o pico de RSS ser só dela
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=consume,
+                                  args=(path, workers, load_all, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        sample = write_files(directory, 3)
+        for user in build_users(read_records(sample['csv'])):
+            print(user)
+
+        # Campo com quebra de linha atravessando o limite do bloco
+        multiline = os.path.join(directory, 'multiline.csv')
+        with open(multiline, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(FIELDS)
+            writer.writerow(['Ana', 'Cruz', 31, '', 'Rua A\nApto 2'])
+            writer.writerow(['Rui', 'Cruz', 40, '', 'Rua B'])
+        for workers in (0, 2):
+            users = list(build_users(
+                read_records(multiline, chunk_lines=1, workers=workers)
+            ))
+            assert len(users) == 2 and \
+                users[0].addresses == ['Rua A\nApto 2']
+        print(users[0])
+        director = UserDirector(UserBuilder())
+        records = ({'firstname': r['firstname'], 'lastname': r['lastname'],
+                    'age': r['age']}
+                   for r in read_records(sample['jsonl']))
+        print(next(direct_users(records, director.with_age)))
+        print()
+
+        print(f'{"usuários":>10}{"formato":>9}{"modo":>20}'
+              f'{"usuários/s":>14}{"pico RSS (MB)":>16}')
+        for n_users in SIZES:
+            paths = write_files(directory, n_users)
+            for fmt, path in paths.items():
+                for name, workers, load_all in [
+                    ('carrega tudo', 0, True),
+                    ('streaming', 0, False),
+                    ('streaming, 2 procs', 2, False),
+                ]:
+                    count, elapsed, peak = measure(path, workers, load_all)
+                    assert count == n_users
+                    print(f'{n_users:>10,}{fmt:>9}{name:>20}'
+                          f'{count / elapsed:>14,.0f}{peak:>16.1f}')
+            for path in paths.values():
+                os.remove(path)
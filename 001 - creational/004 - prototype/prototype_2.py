@@ -0,0 +1,200 @@
+"""
+Prototype com clonagem copy-on-write (cópia na escrita).
+
+Em prototype_1.py o Person.clone reconstrói todos os Address com
+Address.clone, mesmo que a maioria dos clones nunca mexa nos endereços.
+Com um protótipo de 1000 endereços, cada clone custa 1000 objetos.
+
+Aqui cow_clone cria uma pessoa que compartilha a lista de endereços (e os
+próprios Address) com o protótipo. A cópia de verdade só acontece quando
+alguém altera os endereços pelos métodos da pessoa (add_address,
+update_address, remove_address): aí a lista e os endereços são clonados
+e aquela pessoa passa a ter a sua própria cópia.
+
+Enquanto estão compartilhados, os Address ficam congelados: alterar um
+deles diretamente (pessoa.addresses[0].street = ...) gera TypeError, em
+vez de alterar o endereço de todos os clones. Pelo mesmo motivo,
+pessoa.addresses é uma visão somente leitura (AddressesView), sem
+append nem del.
+"""
+from __future__ import annotations
+from typing import List
+from abc import ABC
+from collections.abc import Sequence
+
+
+class StringReprMixin(ABC):
+    def __str__(self) -> str:
+        params = ', '.join([
+            f'{k}={v}' for k, v in self.__dict__.items()
+            if not k.startswith('_')
+        ])
+        return f'{self.__class__.__name__}({params})'
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class Address(StringReprMixin):
+    def __init__(self, street: str, number: str) -> None:
+        self._frozen = False
+        self.street = street
+        self.number = number
+
+    def __setattr__(self, name, value) -> None:
+        if getattr(self, '_frozen', False):
+            raise TypeError(
+                'Address compartilhado entre clones; use '
+                'Person.update_address'
+            )
+        super().__setattr__(name, value)
+
+    def freeze(self) -> None:
+        super().__setattr__('_frozen', True)
+
+    def clone(self) -> Address:
+        return Address(self.street, self.number)
+
+
+class AddressesView(Sequence):
+    """ Lista de endereços de uma Person, sem métodos de escrita """
+
+    __slots__ = ('_person',)
+
+    def __init__(self, person: Person) -> None:
+        self._person = person
+
+    def __getitem__(self, index):
+        return self._person._addresses[index]
+
+    def __len__(self) -> int:
+        return len(self._person._addresses)
+
+    def __repr__(self) -> str:
+        return repr(self._person._addresses)
+
+
+class Person(StringReprMixin):
+    def __init__(self, firstname: str, lastname: str) -> None:
+        self.firstname = firstname
+        self.lastname = lastname
+        self._addresses: List[Address] = []
+        self._shared = False
+
+    @property
+    def addresses(self) -> AddressesView:
+        """ Somente leitura; para alterar use os métodos de Person """
+        return AddressesView(self)
+
+    def _own_addresses(self) -> None:
+        # A cópia de verdade: só acontece na primeira escrita
+        if self._shared:
+            self._addresses = [address.clone() for address in self._addresses]
+            self._shared = False
+
+    def add_address(self, address: Address) -> None:
+        self._own_addresses()
+        self._addresses.append(address)
+
+    def update_address(self, index: int, **changes) -> None:
+        self._own_addresses()
+        address = self._addresses[index]
+        for name, value in changes.items():
+            setattr(address, name, value)
+
+    def remove_address(self, index: int) -> None:
+        self._own_addresses()
+        del self._addresses[index]
+
+    def clone(self) -> Person:
+        """ Cópia completa, como em prototype_1.py """
+        new_person = Person(self.firstname, self.lastname)
+        for address in self._addresses:
+            new_person.add_address(address.clone())
+
+        return new_person
+
+    def cow_clone(self) -> Person:
+        if not self._shared:
+            # Primeiro compartilhamento desta lista: congela os endereços
+            # uma vez; os próximos cow_clone são O(1)
+            for address in self._addresses:
+                address.freeze()
+            self._shared = True
+
+        new_person = Person.__new__(Person)
+        new_person.firstname = self.firstname
+        new_person.lastname = self.lastname
+        new_person._addresses = self._addresses
+        new_person._shared = True
+        return new_person
+
+    def __str__(self) -> str:
+        return (f'{self.__class__.__name__}(firstname={self.firstname}, '
+                f'lastname={self.lastname}, addresses={self._addresses})')
+
+
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    N_ADDRESSES = 1_000
+    N_CLONES = 100_000
+    N_EAGER = 1_000
+
+    luiz = Person('Luiz', 'Miranda')
+    endereco_luiz = Address('Av. Brasil', '250')
+    luiz.add_address(endereco_luiz)
+
+    esposa_luiz = luiz.cow_clone()
+    esposa_luiz.firstname = 'Letícia'
+    print(esposa_luiz._addresses is luiz._addresses)
+
+    try:
+        esposa_luiz.addresses[0].number = '251'
+    except TypeError as error:
+        print('TypeError:', error)
+
+    try:
+        esposa_luiz.addresses.append(Address('Rua Nova', '1'))
+    except AttributeError as error:
+        print('AttributeError:', error)
+
+    esposa_luiz.update_address(0, number='251')
+    print(luiz)
+    print(esposa_luiz)
+    print()
+
+    prototype = Person('Proto', 'Tipo')
+    for i in range(N_ADDRESSES):
+        prototype.add_address(Address(f'Rua {i}', str(i)))
+
+    def measure(clone, n: int):
+        tracemalloc.start()
+        start = time.perf_counter()
+        clones = [clone() for _ in range(n)]
+        elapsed = time.perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return clones, elapsed / n, current / n
+
+    print(f'protótipo com {N_ADDRESSES} endereços')
+    print(f'{"modo":<30}{"clones":>10}{"µs/clone":>12}{"bytes/clone":>14}')
+
+    _, per_clone, memory = measure(prototype.clone, N_EAGER)
+    print(f'{"clone (cópia completa)":<30}{N_EAGER:>10,}'
+          f'{per_clone * 1e6:>12.1f}{memory:>14,.0f}')
+
+    clones, per_clone, memory = measure(prototype.cow_clone, N_CLONES)
+    print(f'{"cow_clone":<30}{N_CLONES:>10,}'
+          f'{per_clone * 1e6:>12.2f}{memory:>14,.0f}')
+
+    # Custo da primeira escrita: 1% dos clones alteram um endereço
+    writers = clones[::100]
+    start = time.perf_counter()
+    for person in writers:
+        person.update_address(0, street='Rua Nova')
+    elapsed = (time.perf_counter() - start) / len(writers)
+    print(f'{"1ª escrita num cow_clone":<30}{len(writers):>10,}'
+          f'{elapsed * 1e6:>12.1f}{"":>14}')
+    print(prototype.addresses[0], clones[0].addresses[0])
@@ -0,0 +1,201 @@
+"""
+Registro de protótipos com clonagem em lote.
+
+Para criar muitos Person quase iguais a partir de poucos modelos, os
+protótipos ficam num registro, por nome. clone_many(nome, n, overrides)
+devolve n clones (a lista de saída é alocada de uma vez) e aplica a cada
+clone o seu dicionário de campos alterados.
+
+Existem três formas de copiar um protótipo:
+    clone: o método escrito à mão (prototype_1.py).
+    deepcopy: copy.deepcopy.
+    pickle: pickle.dumps com o protocolo 5 uma vez por lote e
+        pickle.loads para cada clone.
+
+A mais rápida depende do formato do objeto (poucos ou muitos objetos
+internos), então o registro mede as três quando o protótipo é registrado
+e guarda a vencedora. Só entram na medição as estratégias cujo clone de
+teste tem o mesmo conteúdo do protótipo sem compartilhar com ele nenhum
+objeto mutável (um clone escrito à mão pode esquecer um campo). Se
+nenhuma passar, register pede a estratégia explícita.
+
+A função de cópia de cada protótipo é montada no register (no pickle, os
+bytes ficam guardados), então o protótipo não deve ser alterado depois
+de registrado.
+"""
+import copy
+import pickle
+import time
+import types
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from prototype_1 import Address, Person
+
+STRATEGIES = ('clone', 'deepcopy', 'pickle')
+# Podem ser o mesmo objeto no protótipo e no clone
+_SHARED = (type, types.FunctionType, types.BuiltinFunctionType,
+           types.MethodType, types.ModuleType)
+
+
+def _copier(prototype, strategy: str) -> Callable[[], object]:
+    if strategy == 'clone':
+        return prototype.clone
+    if strategy == 'deepcopy':
+        return lambda: copy.deepcopy(prototype)
+    # O protótipo é serializado uma vez; cada clone é só um loads
+    data = pickle.dumps(prototype, protocol=5)
+    return lambda: pickle.loads(data)
+
+
+def _same_copy(original, copied,
+               seen: Optional[Set[Tuple[int, int]]] = None) -> bool:
+    """
+    copied tem o mesmo conteúdo que original e não compartilha com ele
+    listas, dicionários, conjuntos nem objetos com __dict__
+    """
+    if original is None or isinstance(original, _SHARED):
+        return original is copied
+    if type(original) is not type(copied):
+        return False
+    seen = set() if seen is None else seen
+    pair = (id(original), id(copied))
+    if pair in seen:
+        return True
+    seen.add(pair)
+
+    mutable = isinstance(original, (list, dict, set, bytearray)) or \
+        hasattr(original, '__dict__')
+    if mutable and original is copied:
+        return False
+    if isinstance(original, (list, tuple)):
+        return len(original) == len(copied) and all(
+            _same_copy(a, b, seen) for a, b in zip(original, copied)
+        )
+    if isinstance(original, dict):
+        return original.keys() == copied.keys() and all(
+            _same_copy(value, copied[key], seen)
+            for key, value in original.items()
+        )
+    if hasattr(original, '__dict__'):
+        return _same_copy(vars(original), vars(copied), seen)
+    return original == copied
+
+
+class PrototypeRegistry:
+    def __init__(self, calibration_runs: int = 20) -> None:
+        self.calibration_runs = calibration_runs
+        self._prototypes: Dict[str, object] = {}
+        self._strategies: Dict[str, str] = {}
+        self._copiers: Dict[str, Callable[[], object]] = {}
+
+    def register(self, name: str, prototype,
+                 strategy: Optional[str] = None) -> str:
+        """ Registra o protótipo e devolve a estratégia escolhida """
+        assert strategy is None or strategy in STRATEGIES, \
+            'Estratégia não existe'
+        strategy = strategy or self._fastest(prototype)
+        self._prototypes[name] = prototype
+        self._strategies[name] = strategy
+        self._copiers[name] = _copier(prototype, strategy)
+        return strategy
+
+    def unregister(self, name: str) -> None:
+        del self._prototypes[name]
+        del self._strategies[name]
+        del self._copiers[name]
+
+    def strategy(self, name: str) -> str:
+        return self._strategies[name]
+
+    def _fastest(self, prototype) -> str:
+        timings = {}
+        for strategy in STRATEGIES:
+            if strategy == 'clone' and not callable(
+                    getattr(prototype, 'clone', None)):
+                continue
+            try:
+                copier = _copier(prototype, strategy)
+                # Só compara a velocidade de cópias que dão o mesmo clone
+                if not _same_copy(prototype, copier()):
+                    continue
+                start = time.perf_counter()
+                for _ in range(self.calibration_runs):
+                    copier()
+                timings[strategy] = time.perf_counter() - start
+            except (pickle.PicklingError, TypeError, AttributeError):
+                continue
+        if not timings:
+            raise ValueError(
+                'Nenhuma estratégia copia o protótipo inteiro; escolha '
+                f'uma de {STRATEGIES} em register'
+            )
+        return min(timings, key=timings.get)
+
+    def clone(self, name: str, **overrides):
+        return self.clone_many(name, 1, [overrides])[0]
+
+    def clone_many(self, name: str, n: int,
+                   overrides: Optional[Sequence[Dict]] = None) -> List:
+        """
+        overrides, se informado, tem um dicionário de campos por clone
+        (len(overrides) == n).
+        """
+        assert overrides is None or len(overrides) == n, \
+            'overrides precisa ter um item por clone'
+        copier = self._copiers[name]
+        clones: List = [None] * n
+
+        if overrides is None:
+            for i in range(n):
+                clones[i] = copier()
+            return clones
+
+        for i, changes in enumerate(overrides):
+            new_object = copier()
+            for field, value in changes.items():
+                setattr(new_object, field, value)
+            clones[i] = new_object
+        return clones
+
+
+if __name__ == "__main__":
+    N_CLONES = 10_000
+    SHAPES = {'raso (1 endereço)': 1, 'médio (10 endereços)': 10,
+              'profundo (1000 endereços)': 1_000}
+
+    def make_person(n_addresses: int) -> Person:
+        person = Person('Luiz', 'Miranda')
+        for i in range(n_addresses):
+            person.add_address(Address(f'Rua {i}', str(i)))
+        return person
+
+    registry = PrototypeRegistry()
+    registry.register('cliente', make_person(1))
+    nomes = [{'firstname': f'Cliente{i}'} for i in range(3)]
+    for person in registry.clone_many('cliente', 3, nomes):
+        print(person)
+    print(registry.clone('cliente', lastname='Cruz'))
+
+    # clone() de prototype_1.py não copia campos criados fora do __init__
+    apelidado = make_person(1)
+    apelidado.apelido = 'Lu'
+    assert registry.register('apelidado', apelidado) != 'clone'
+    assert registry.clone('apelidado').apelido == 'Lu'
+    print()
+
+    print(f'{N_CLONES:,} clones por medição ({N_CLONES // 10:,} no '
+          'profundo), µs por clone')
+    print(f'{"formato":<28}' + ''.join(f'{s:>10}' for s in STRATEGIES)
+          + f'{"escolhida":>12}')
+    for shape, n_addresses in SHAPES.items():
+        prototype = make_person(n_addresses)
+        n = N_CLONES if n_addresses < 1_000 else N_CLONES // 10
+        row = f'{shape:<28}'
+        for strategy in STRATEGIES:
+            registry.register(shape, prototype, strategy)
+            start = time.perf_counter()
+            registry.clone_many(shape, n)
+            elapsed = time.perf_counter() - start
+            row += f'{elapsed / n * 1e6:>10.1f}'
+        row += f'{registry.register(shape, prototype):>12}'
+        print(row)
@@ -9,27 +9,101 @@ Princípio do aberto/fechado (Open/closed principle)
 Entidades devem ser abertas para extensão, mas fechadas para modificação
 """
 from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple
+
+
+def _scale(totals: Sequence[float], factor: float):
+    # Array NumPy: uma única operação vetorizada; senão, lista
+    if hasattr(totals, 'dtype'):
+        return totals * factor
+    return [total * factor for total in totals]
 
 
 class DiscountStrategy(ABC):
     @abstractmethod
     def calculate(self, total: float) -> float: pass
 
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        """
+        Calcula vários totais de uma vez. Aceita lista ou array NumPy e
+        devolve o mesmo tipo (subclasses sem versão própria usam calculate).
+        """
+        if hasattr(totals, 'dtype'):
+            import numpy as np
+            return np.fromiter(map(self.calculate, totals), dtype=float,
+                               count=len(totals))
+        return [self.calculate(total) for total in totals]
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        """
+        (escala, deslocamento) se calculate(total) for
+        total * escala + deslocamento; None se não for
+        """
+        return None
+
+    def _key(self) -> Optional[Tuple]:
+        """
+        Estratégias da mesma classe e com a mesma chave dão o mesmo
+        desconto (e são iguais); None compara só pela identidade
+        """
+        return None
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        key = self._key()
+        return key is not None and key == other._key()
+
+    def __hash__(self) -> int:
+        key = self._key()
+        if key is None:
+            return object.__hash__(self)
+        return hash((type(self), key))
+
 
 class TwentyPercent(DiscountStrategy):
     def calculate(self, total: float) -> float:
         return total * 0.8
 
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        return _scale(totals, 0.8)
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        return 0.8, 0.0
+
+    def _key(self) -> Optional[Tuple]:
+        return ()
+
 
 class FiftyPercent(DiscountStrategy):
     def calculate(self, total: float) -> float:
         return total * 0.5
 
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        return _scale(totals, 0.5)
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        return 0.5, 0.0
+
+    def _key(self) -> Optional[Tuple]:
+        return ()
+
 
 class NoDiscount(DiscountStrategy):
     def calculate(self, total: float) -> float:
         return total
 
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        return totals.copy() if hasattr(totals, 'dtype') else list(totals)
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        return 1.0, 0.0
+
+    def _key(self) -> Optional[Tuple]:
+        return ()
+
 
 class CustomDiscount(DiscountStrategy):
     def __init__(self, discount: float) -> None:
@@ -38,6 +112,15 @@ class CustomDiscount(DiscountStrategy):
     def calculate(self, total: float) -> float:
         return total * (1 - self._discount)
 
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        return _scale(totals, 1 - self._discount)
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        return 1 - self._discount, 0.0
+
+    def _key(self) -> Optional[Tuple]:
+        return (self._discount,)
+
 
 class Order:
     def __init__(self, total: float, discount: DiscountStrategy) -> None:
@@ -48,6 +131,10 @@ class Order:
     def total(self):
         return self._total
 
+    @property
+    def discount(self) -> DiscountStrategy:
+        return self._discount
+
     @property
     def total_with_discount(self):
         return self._discount.calculate(self._total)
@@ -75,3 +162,6 @@ if __name__ == "__main__":
 
     print(order4.total)
     print(order4.total_with_discount)
+
+    print(five_percent.calculate_batch([1000, 500, 100]))
+    print(CustomDiscount(5) == five_percent, TwentyPercent() == fifty_percent)
@@ -0,0 +1,150 @@
+"""
+Descontos em lote com OrderBatch.
+
+Order.total_with_discount, em strategy_1.py, chama calculate uma vez por
+pedido. Para reprecificar milhões de pedidos, o OrderBatch agrupa os
+pedidos por estratégia e chama calculate_batch uma única vez por grupo:
+com NumPy instalado, cada grupo vira um array e o desconto é uma operação
+vetorizada; sem NumPy, o grupo é uma lista.
+
+Pedidos com estratégias iguais (por exemplo, duas instâncias de
+CustomDiscount(5)) caem no mesmo grupo. Com NumPy, as posições e os
+totais de cada grupo são guardados em array.array, que viram arrays
+NumPy sem copiar elemento por elemento (np.frombuffer).
+
+Os resultados voltam na mesma ordem em que os pedidos foram adicionados.
+"""
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from strategy_1 import DiscountStrategy, Order
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+Group = Tuple[List[int], List[float]]
+
+
+class OrderBatch:
+    def __init__(self, orders: Iterable[Order] = ()) -> None:
+        # Estratégia -> (posições dos pedidos, totais)
+        self._groups: Dict[DiscountStrategy, Group] = {}
+        # id da estratégia -> grupo: o __hash__/__eq__ das estratégias só
+        # roda uma vez por instância, não por pedido. _seen mantém as
+        # instâncias vivas para o id não ser reusado
+        self._by_id: Dict[int, Group] = {}
+        self._seen: List[DiscountStrategy] = []
+        self._size = 0
+        self.extend(orders)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, order: Order) -> None:
+        self.add_total(order.total, order.discount)
+
+    def _group(self, discount: DiscountStrategy) -> Group:
+        group = self._groups.get(discount)
+        if group is None:
+            if np is not None:
+                group = (array('q'), array('d'))
+            else:
+                group = ([], [])
+            self._groups[discount] = group
+        self._by_id[id(discount)] = group
+        self._seen.append(discount)
+        return group
+
+    def extend(self, orders: Iterable[Order]) -> None:
+        by_id = self._by_id
+        position = self._size
+        for order in orders:
+            discount = order.discount
+            group = by_id.get(id(discount))
+            if group is None:
+                group = self._group(discount)
+            group[0].append(position)
+            group[1].append(order.total)
+            position += 1
+        self._size = position
+
+    def add_total(self, total: float, discount: DiscountStrategy) -> None:
+        group = self._by_id.get(id(discount))
+        if group is None:
+            group = self._group(discount)
+        group[0].append(self._size)
+        group[1].append(total)
+        self._size += 1
+
+    def totals_with_discount(self):
+        """ Um total com desconto por pedido (array NumPy ou lista) """
+        if np is not None:
+            result = np.empty(self._size)
+            for discount, (positions, totals) in self._groups.items():
+                result[np.frombuffer(positions, dtype=np.int64)] = \
+                    discount.calculate_batch(
+                        np.frombuffer(totals, dtype=float)
+                    )
+            return result
+
+        result = [None] * self._size
+        for discount, (positions, totals) in self._groups.items():
+            for position, total in zip(positions,
+                                       discount.calculate_batch(totals)):
+                result[position] = total
+        return result
+
+
+if __name__ == "__main__":
+    import time
+    from random import choice, uniform
+
+    from strategy_1 import (CustomDiscount, FiftyPercent, NoDiscount,
+                            TwentyPercent)
+
+    N_ORDERS = 1_000_000
+
+    strategies = [TwentyPercent(), FiftyPercent(), NoDiscount(),
+                  CustomDiscount(5)]
+    batch = OrderBatch(Order(1000, strategy) for strategy in strategies)
+    print(list(batch.totals_with_discount()))
+    print()
+
+    orders = [Order(round(uniform(1, 5000), 2), choice(strategies))
+              for _ in range(N_ORDERS)]
+
+    def per_order() -> List[float]:
+        return [order.total_with_discount for order in orders]
+
+    def order_batch():
+        return OrderBatch(orders).totals_with_discount()
+
+    columns = {strategy: [o.total for o in orders if o.discount is strategy]
+               for strategy in strategies}
+    # Instâncias iguais de CustomDiscount(5) formam um único grupo
+    assert len(OrderBatch(Order(1, CustomDiscount(5))
+                          for _ in range(3))._groups) == 1
+    if np is not None:
+        columns = {strategy: np.array(totals)
+                   for strategy, totals in columns.items()}
+
+    def grouped_columns() -> List:
+        # Totais já guardados em colunas por estratégia
+        return [strategy.calculate_batch(totals)
+                for strategy, totals in columns.items()]
+
+    assert list(order_batch()) == per_order()
+
+    print(f'{N_ORDERS:,} pedidos, NumPy: '
+          f'{"sim" if np is not None else "não (listas)"}')
+    print(f'{"modo":<32}{"s":>8}{"pedidos/s":>16}')
+    for name, func in [('total_with_discount por pedido', per_order),
+                       ('OrderBatch (agrupa + calcula)', order_batch),
+                       ('calculate_batch por coluna', grouped_columns)]:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(f'{name:<32}{elapsed:>8.2f}{N_ORDERS / elapsed:>16,.0f}')
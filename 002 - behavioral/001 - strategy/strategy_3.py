@@ -0,0 +1,215 @@
+"""
+Composição de descontos encadeados.
+
+Quando um pedido recebe vários descontos seguidos, cada desconto é uma
+chamada separada de calculate. ChainedDiscount é uma estratégia que
+aplica uma lista de estratégias em sequência, mas antes "funde" os
+descontos que podem ser escritos como total * escala + deslocamento
+(percentuais e valores fixos, via affine()) numa única transformação:
+
+    (t * 0.8) * 0.5 - 10  ->  t * 0.4 - 10
+
+Estratégias que não são lineares (affine() devolve None) continuam sendo
+aplicadas passo a passo, e só os trechos lineares entre elas são fundidos.
+
+FixedAmountDiscount não deixa o total ficar negativo (max com 0), mas os
+percentuais de strategy_1.py não limitam nada. O passo fundido só aplica
+o max com 0 se algum dos descontos fundidos aplicava, então a cadeia
+fundida e a passo a passo dão o mesmo resultado também para totais
+negativos. Isso é exato desde que as escalas não sejam negativas e os
+deslocamentos não sejam positivos (descontos); fora disso, o passo não é
+fundido. Uma cadeia vazia é a identidade (1.0, 0.0).
+Os resultados fundidos podem diferir nos últimos bits do float, porque a
+ordem das multiplicações muda.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from strategy_1 import DiscountStrategy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class FixedAmountDiscount(DiscountStrategy):
+    # calculate aplica max com 0 além de affine()
+    clamps = True
+
+    def __init__(self, amount: float) -> None:
+        assert amount >= 0, 'Desconto não pode ser negativo'
+        self._amount = amount
+
+    def calculate(self, total: float) -> float:
+        return max(total - self._amount, 0)
+
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        if hasattr(totals, 'dtype'):
+            return np.maximum(totals - self._amount, 0)
+        amount = self._amount
+        return [total - amount if total > amount else 0 for total in totals]
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        return 1.0, -self._amount
+
+
+class AffineDiscount(DiscountStrategy):
+    """ total * scale + offset, sem ficar negativo se clamps=True """
+
+    def __init__(self, scale: float, offset: float,
+                 clamps: bool = True) -> None:
+        self.scale = scale
+        self.offset = offset
+        self.clamps = clamps
+
+    def calculate(self, total: float) -> float:
+        value = total * self.scale + self.offset
+        return max(value, 0) if self.clamps else value
+
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        scale, offset = self.scale, self.offset
+        if hasattr(totals, 'dtype'):
+            values = totals * scale + offset
+            return np.maximum(values, 0) if self.clamps else values
+        if not self.clamps:
+            return [total * scale + offset for total in totals]
+        return [max(total * scale + offset, 0) for total in totals]
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        return self.scale, self.offset
+
+    def __repr__(self) -> str:
+        return (f'AffineDiscount({self.scale!r}, {self.offset!r}, '
+                f'{self.clamps!r})')
+
+
+def _fusable(affine: Optional[Tuple[float, float]]) -> bool:
+    return affine is not None and affine[0] >= 0 and affine[1] <= 0
+
+
+def _clamps(strategy: DiscountStrategy) -> bool:
+    """ Se calculate aplica max com 0 além de affine() """
+    return getattr(strategy, 'clamps', False)
+
+
+class ChainedDiscount(DiscountStrategy):
+    def __init__(self, *strategies: DiscountStrategy,
+                 fuse: bool = True) -> None:
+        self.strategies = strategies
+        self.steps: List[DiscountStrategy] = (
+            self._fold(strategies) if fuse else list(strategies)
+        )
+        if len(self.steps) == 1:
+            # Cadeia toda fundida: calculate vira uma chamada só
+            self.calculate = self.steps[0].calculate
+
+    @staticmethod
+    def _fold(strategies) -> List[DiscountStrategy]:
+        steps: List[DiscountStrategy] = []
+        for strategy in strategies:
+            affine = strategy.affine()
+            if not _fusable(affine):
+                steps.append(strategy)
+                continue
+            previous = steps[-1].affine() if steps else None
+            if not _fusable(previous):
+                steps.append(strategy)
+                continue
+            # Aplicar f1 e depois f2 é igual a uma única transformação.
+            # Com escala >= 0 e deslocamento <= 0, o max com 0 de qualquer
+            # passo pode ser aplicado uma vez, no final
+            clamps = _clamps(steps.pop()) or _clamps(strategy)
+            scale, offset = affine
+            steps.append(AffineDiscount(previous[0] * scale,
+                                        previous[1] * scale + offset,
+                                        clamps))
+        return steps
+
+    def then(self, *strategies: DiscountStrategy) -> 'ChainedDiscount':
+        return ChainedDiscount(*self.strategies, *strategies)
+
+    def calculate(self, total: float) -> float:
+        for step in self.steps:
+            total = step.calculate(total)
+        return total
+
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        for step in self.steps:
+            totals = step.calculate_batch(totals)
+        return totals
+
+    @property
+    def clamps(self) -> bool:
+        return len(self.steps) == 1 and _clamps(self.steps[0])
+
+    def affine(self) -> Optional[Tuple[float, float]]:
+        # Permite fundir cadeias dentro de cadeias
+        if not self.steps:
+            return 1.0, 0.0
+        if len(self.steps) == 1:
+            return self.steps[0].affine()
+        return None
+
+
+if __name__ == "__main__":
+    import time
+    from random import uniform
+
+    from strategy_1 import (CustomDiscount, FiftyPercent, NoDiscount, Order,
+                            TwentyPercent)
+
+    N_ORDERS = 200_000
+    CHAIN_SIZES = [1, 2, 5, 10, 20]
+
+    class TieredDiscount(DiscountStrategy):
+        """ Não linear: 10% só acima de 1000 """
+
+        def calculate(self, total: float) -> float:
+            return total * 0.9 if total > 1000 else total
+
+    chain = ChainedDiscount(TwentyPercent(), FiftyPercent(),
+                            FixedAmountDiscount(10))
+    print(chain.steps)
+    print(Order(1000, chain).total_with_discount)
+    mixed = chain.then(TieredDiscount(), CustomDiscount(5), NoDiscount())
+    print(mixed.steps)
+    print(Order(10000, mixed).total_with_discount)
+
+    # Totais negativos: só o FixedAmountDiscount limita em 0
+    percent_only = ChainedDiscount(TwentyPercent(), FiftyPercent())
+    assert percent_only.calculate(-100) == -40
+    assert ChainedDiscount(TwentyPercent(), FixedAmountDiscount(10)) \
+        .calculate(-100) == 0
+    assert ChainedDiscount().affine() == (1.0, 0.0)
+    assert ChainedDiscount(ChainedDiscount(), TwentyPercent()) \
+        .calculate(100) == 80
+    assert FixedAmountDiscount(10).calculate_batch([5, 15]) == [0, 5]
+    print()
+
+    layers = [CustomDiscount(1), FixedAmountDiscount(1), TwentyPercent(),
+              NoDiscount()]
+    totals = [round(uniform(1, 5000), 2) for _ in range(N_ORDERS)]
+
+    def per_order_ns(strategy: DiscountStrategy) -> float:
+        calculate = strategy.calculate
+        start = time.perf_counter()
+        for total in totals:
+            calculate(total)
+        return (time.perf_counter() - start) / N_ORDERS * 1e9
+
+    print(f'{N_ORDERS:,} pedidos, ns por pedido')
+    print(f'{"descontos":>10}{"passo a passo":>16}{"fundido":>10}'
+          f'{"com 1 não linear":>18}')
+    for size in CHAIN_SIZES:
+        strategies = [layers[i % len(layers)] for i in range(size)]
+        step_by_step = ChainedDiscount(*strategies, fuse=False)
+        fused = ChainedDiscount(*strategies)
+        with_custom = ChainedDiscount(*strategies[:size // 2],
+                                      TieredDiscount(),
+                                      *strategies[size // 2:])
+        for total in totals[:1000] + [-50.0, -1.0]:
+            assert abs(step_by_step.calculate(total) -
+                       fused.calculate(total)) < 1e-6
+        print(f'{size:>10}{per_order_ns(step_by_step):>16.0f}'
+              f'{per_order_ns(fused):>10.0f}'
+              f'{per_order_ns(with_custom):>18.0f}')
@@ -0,0 +1,377 @@
+"""
+Descontos em centavos inteiros, com arredondamento exato.
+
+As estratégias de strategy_1.py calculam em float (total * 0.95), então
+o resultado precisa ser arredondado e conciliado depois, e Decimal é
+lento demais para grandes volumes. Aqui os valores são centavos (int) e
+cada desconto é uma fração exata numerador/denominador:
+
+    centavos * numerador / denominador
+
+calculado com divmod de inteiros, sem nenhum float no caminho. O resto da
+divisão decide o arredondamento, com os mesmos nomes e a mesma regra do
+módulo decimal:
+    ROUND_HALF_EVEN: metade vai para o par (padrão, como no Decimal).
+    ROUND_HALF_UP: metade se afasta do zero.
+    ROUND_HALF_DOWN: metade vai em direção ao zero.
+    ROUND_UP: qualquer fração se afasta do zero.
+    ROUND_DOWN: descarta a fração (em direção ao zero).
+    ROUND_CEILING: em direção a +infinito.
+    ROUND_FLOOR: em direção a -infinito.
+
+CentsDiscount.from_strategy converte qualquer estratégia linear (com
+affine(), inclusive cadeias fundidas de strategy_3.py) usando a escala
+com até 10 casas decimais e o deslocamento em centavos. Uma cadeia
+fundida arredonda uma única vez, no final. O próprio CentsDiscount não é
+linear (arredonda e não fica negativo), então o seu affine() é None.
+
+calculate_cents recebe um int; calculate_cents_batch recebe uma lista ou
+um array NumPy de inteiros (int64). calculate e calculate_batch seguem o
+contrato de DiscountStrategy (valores em reais, como em Order e
+OrderBatch): convertem para centavos na entrada e de volta na saída.
+"""
+from decimal import (ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN,
+                     ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP, Decimal)
+from fractions import Fraction
+from typing import List, Sequence
+
+from strategy_1 import DiscountStrategy
+
+ROUNDING_MODES = (ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_HALF_DOWN, ROUND_UP,
+                  ROUND_DOWN, ROUND_CEILING, ROUND_FLOOR)
+
+
+def to_cents(value, rounding: str = ROUND_HALF_EVEN) -> int:
+    """ '12.345', 12.34 ou Decimal -> centavos """
+    return int((Decimal(str(value)) * 100).to_integral_value(rounding))
+
+
+def from_cents(cents: int) -> str:
+    sign = '-' if cents < 0 else ''
+    units, cents = divmod(abs(cents), 100)
+    return f'{sign}{units}.{cents:02d}'
+
+
+def _round_increment(quotient: int, remainder: int, denominator: int,
+                     rounding: str) -> int:
+    """
+    O valor exato é quotient + remainder / denominator, com quotient
+    arredondado para baixo (divmod). Devolve 0 ou 1 para somar.
+    """
+    if not remainder or rounding == ROUND_FLOOR:
+        return 0
+    if rounding == ROUND_CEILING:
+        return 1
+    negative = quotient < 0
+    if rounding == ROUND_UP:
+        return 0 if negative else 1
+    if rounding == ROUND_DOWN:
+        return 1 if negative else 0
+
+    double = 2 * remainder
+    if double != denominator:
+        return 1 if double > denominator else 0
+    # Exatamente na metade
+    if rounding == ROUND_HALF_UP:
+        return 0 if negative else 1
+    if rounding == ROUND_HALF_DOWN:
+        return 1 if negative else 0
+    return quotient & 1
+
+
+def multiply_cents(cents: int, numerator: int, denominator: int,
+                   rounding: str = ROUND_HALF_EVEN) -> int:
+    quotient, remainder = divmod(cents * numerator, denominator)
+    return quotient + _round_increment(quotient, remainder, denominator,
+                                       rounding)
+
+
+def _multiply_cents_numpy(cents, numerator: int, denominator: int,
+                          rounding: str):
+    import numpy as np
+    quotient, remainder = np.divmod(cents * numerator, denominator)
+    has_fraction = remainder != 0
+    negative = quotient < 0
+    double = 2 * remainder
+
+    if rounding == ROUND_FLOOR:
+        increment = np.zeros_like(has_fraction)
+    elif rounding == ROUND_CEILING:
+        increment = has_fraction
+    elif rounding == ROUND_UP:
+        increment = has_fraction & ~negative
+    elif rounding == ROUND_DOWN:
+        increment = has_fraction & negative
+    else:
+        if rounding == ROUND_HALF_UP:
+            tie = ~negative
+        elif rounding == ROUND_HALF_DOWN:
+            tie = negative
+        else:
+            tie = (quotient & 1) == 1
+        increment = np.where(double == denominator, tie,
+                             double > denominator) & has_fraction
+    return quotient + increment
+
+
+class CentsDiscount(DiscountStrategy):
+    """ max(centavos * numerator / denominator + offset_cents, 0) """
+
+    def __init__(self, numerator: int, denominator: int = 1,
+                 offset_cents: int = 0,
+                 rounding: str = ROUND_HALF_EVEN) -> None:
+        assert denominator > 0, 'Denominador precisa ser positivo'
+        assert rounding in ROUNDING_MODES, 'Arredondamento não existe'
+        rate = Fraction(numerator, denominator)
+        self.numerator = rate.numerator
+        self.denominator = rate.denominator
+        self.offset_cents = offset_cents
+        self.rounding = rounding
+        # Totais >= 0: o arredondamento vira um deslocamento antes de uma
+        # única divisão por 2 * denominator (ver _nonnegative_batch)
+        d = self.denominator
+        self._n2, self._d2 = 2 * self.numerator, 2 * d
+        self._bias = {ROUND_FLOOR: 0, ROUND_DOWN: 0,
+                      ROUND_CEILING: 2 * d - 2, ROUND_UP: 2 * d - 2,
+                      ROUND_HALF_UP: d, ROUND_HALF_DOWN: d - 1,
+                      ROUND_HALF_EVEN: d}[rounding]
+        self._half_even = rounding == ROUND_HALF_EVEN
+
+    @classmethod
+    def percent_off(cls, percent, rounding: str = ROUND_HALF_EVEN):
+        """ percent_off('12.5') é 12,5% de desconto """
+        rate = 1 - Fraction(Decimal(str(percent))) / 100
+        return cls(rate.numerator, rate.denominator, rounding=rounding)
+
+    @classmethod
+    def from_strategy(cls, strategy: DiscountStrategy,
+                      rounding: str = ROUND_HALF_EVEN) -> 'CentsDiscount':
+        affine = strategy.affine()
+        if affine is None:
+            raise TypeError(
+                f'{type(strategy).__name__} não é linear e não tem versão '
+                'em centavos'
+            )
+        scale, offset = affine
+        rate = Fraction(Decimal(repr(round(scale, 10))))
+        return cls(rate.numerator, rate.denominator,
+                   to_cents(offset, rounding), rounding)
+
+    def calculate(self, total: float) -> float:
+        return self.calculate_cents(to_cents(total, self.rounding)) / 100
+
+    def calculate_batch(self, totals: Sequence[float]) -> List[float]:
+        if hasattr(totals, 'dtype'):
+            import numpy as np
+            cents = np.rint(np.asarray(totals, dtype=float) * 100)
+            return self.calculate_cents_batch(cents.astype(np.int64)) / 100
+        rounding = self.rounding
+        cents = self.calculate_cents_batch(
+            [to_cents(total, rounding) for total in totals]
+        )
+        return [value / 100 for value in cents]
+
+    def calculate_cents(self, total: int) -> int:
+        if total >= 0 and self._n2 >= 0:
+            quotient, remainder = divmod(total * self._n2 + self._bias,
+                                         self._d2)
+            if self._half_even and not remainder and quotient & 1:
+                quotient -= 1
+        else:
+            quotient = multiply_cents(total, self.numerator,
+                                      self.denominator, self.rounding)
+        cents = quotient + self.offset_cents
+        return cents if cents > 0 else 0
+
+    def calculate_cents_batch(self, totals: Sequence[int]) -> List[int]:
+        if hasattr(totals, 'dtype'):
+            import numpy as np
+            if totals.dtype.kind not in 'iuO':
+                raise TypeError(
+                    f'Centavos precisam ser inteiros, não {totals.dtype}'
+                )
+            # Sem estouro de int64 na multiplicação; senão, ints do Python
+            limit = (2 ** 63 - 1) // max(self.numerator, 1)
+            if len(totals) and np.abs(totals).max() <= limit:
+                cents = _multiply_cents_numpy(
+                    totals, self.numerator, self.denominator, self.rounding
+                ) + self.offset_cents
+                return np.maximum(cents, 0)
+            return np.array(self.calculate_cents_batch(totals.tolist()),
+                            dtype=object)
+
+        if self.numerator >= 0 and totals and min(totals) >= 0:
+            result = self._nonnegative_batch(totals)
+            if self.offset_cents:
+                offset = self.offset_cents
+                result = [cents + offset if cents + offset > 0 else 0
+                          for cents in result]
+            return result
+
+        numerator, denominator = self.numerator, self.denominator
+        rounding, offset = self.rounding, self.offset_cents
+        result = []
+        append = result.append
+        for total in totals:
+            quotient, remainder = divmod(total * numerator, denominator)
+            if remainder:
+                quotient += _round_increment(quotient, remainder,
+                                             denominator, rounding)
+            cents = quotient + offset
+            append(cents if cents > 0 else 0)
+        return result
+
+    def _nonnegative_batch(self, totals: Sequence[int]) -> List[int]:
+        """
+        Com totais >= 0, cada modo vira uma única divisão inteira
+        (ex.: HALF_UP é (2 * t * n + d) // 2d), sem testar o resto
+        """
+        n, d, rounding = self.numerator, self.denominator, self.rounding
+        if rounding in (ROUND_FLOOR, ROUND_DOWN):
+            return [t * n // d for t in totals]
+        if rounding in (ROUND_CEILING, ROUND_UP):
+            return [(t * n + d - 1) // d for t in totals]
+
+        n2, d2 = 2 * n, 2 * d
+        if rounding == ROUND_HALF_UP:
+            return [(t * n2 + d) // d2 for t in totals]
+        if rounding == ROUND_HALF_DOWN:
+            return [(t * n2 + d - 1) // d2 for t in totals]
+
+        # HALF_EVEN: arredonda a metade para cima e corrige os empates
+        # que caíram num número ímpar
+        result = []
+        append = result.append
+        for t in totals:
+            quotient, remainder = divmod(t * n2 + d, d2)
+            append(quotient - 1 if not remainder and quotient & 1
+                   else quotient)
+        return result
+
+    def affine(self):
+        # calculate_cents arredonda para centavos e não deixa o valor ficar
+        # negativo: não é total * escala + deslocamento, e fundir com
+        # outras estratégias (strategy_3.py) daria outro resultado
+        return None
+
+    def __repr__(self) -> str:
+        return (f'CentsDiscount({self.numerator}, {self.denominator}, '
+                f'{self.offset_cents}, {self.rounding})')
+
+
+if __name__ == "__main__":
+    import time
+    from decimal import localcontext
+    from random import choice, randint
+
+    from strategy_1 import CustomDiscount, Order, TwentyPercent
+    from strategy_2 import OrderBatch
+    from strategy_3 import ChainedDiscount, FixedAmountDiscount
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    N_ORDERS = 1_000_000
+    N_CHECKS = 200_000
+
+    five_percent = CentsDiscount.from_strategy(CustomDiscount(5))
+    chain = CentsDiscount.from_strategy(
+        ChainedDiscount(TwentyPercent(), CustomDiscount(7),
+                        FixedAmountDiscount(10)),
+        ROUND_HALF_UP,
+    )
+    print(five_percent,
+          from_cents(five_percent.calculate_cents(to_cents('19.99'))))
+    print(chain, from_cents(chain.calculate_cents(to_cents('19.99'))))
+    print(CentsDiscount.percent_off('12.5')
+          .calculate_cents_batch([1, 3, 5, 7]))
+
+    # Como DiscountStrategy, em reais: Order e OrderBatch de strategy_2.py
+    orders = [Order(19.99, five_percent), Order(100.0, chain)]
+    assert [order.total_with_discount for order in orders] == [18.99, 64.4]
+    assert list(OrderBatch(orders).totals_with_discount()) == [18.99, 64.4]
+    if np is not None:
+        assert five_percent.calculate_batch(np.array([19.99])).tolist() == \
+            [18.99]
+    print()
+
+    # Verificação por propriedade: mesmo resultado que o Decimal
+    with localcontext() as context:
+        context.prec = 60
+        for _ in range(N_CHECKS):
+            cents = randint(-10 ** 9, 10 ** 9)
+            numerator = randint(0, 10 ** 4)
+            denominator = choice([2, 4, 8, 10, 100, 1000, 3, 6, 7, 10 ** 4])
+            rounding = choice(ROUNDING_MODES)
+            expected = (Decimal(cents) * numerator / denominator) \
+                .to_integral_value(rounding)
+            result = multiply_cents(cents, numerator, denominator, rounding)
+            assert result == expected, (cents, numerator, denominator,
+                                        rounding, result, expected)
+            batch = CentsDiscount(numerator, denominator,
+                                  rounding=rounding)
+            assert batch.calculate_cents(cents) == max(result, 0)
+            sample = [abs(cents), abs(cents) + 1, cents % denominator]
+            expected = [batch.calculate_cents(total) for total in sample]
+            assert batch.calculate_cents_batch(sample) == expected
+            if np is not None:
+                # Caminho vetorizado em int64, com negativos
+                sample = np.array(sample + [cents, -abs(cents) - 1],
+                                  dtype=np.int64)
+                assert batch.calculate_cents_batch(sample).tolist() == \
+                    [batch.calculate_cents(int(total)) for total in sample]
+    print(f'{N_CHECKS:,} casos aleatórios iguais ao Decimal em '
+          f'{len(ROUNDING_MODES)} modos de arredondamento'
+          f'{" (também em NumPy int64)" if np is not None else ""}')
+    print()
+
+    totals = [randint(1, 500_000) for _ in range(N_ORDERS)]
+    float_totals = [cents / 100 for cents in totals]
+    decimal_totals = [Decimal(cents).scaleb(-2) for cents in totals]
+    float_discount = CustomDiscount(5)
+    decimal_rate = Decimal('0.95')
+    cent = Decimal('0.01')
+
+    def with_float() -> List:
+        calculate = float_discount.calculate
+        return [round(calculate(total), 2) for total in float_totals]
+
+    def with_decimal() -> List:
+        return [(total * decimal_rate).quantize(cent, ROUND_HALF_EVEN)
+                for total in decimal_totals]
+
+    def with_cents() -> List:
+        calculate = five_percent.calculate_cents
+        return [calculate(total) for total in totals]
+
+    def with_cents_batch() -> List:
+        return five_percent.calculate_cents_batch(totals)
+
+    modes = [('float + round', with_float),
+             ('Decimal.quantize', with_decimal),
+             ('centavos, calculate_cents', with_cents),
+             ('centavos, calculate_cents_batch', with_cents_batch)]
+    if np is not None:
+        int64_totals = np.array(totals, dtype=np.int64)
+
+        def with_cents_numpy():
+            return five_percent.calculate_cents_batch(int64_totals)
+
+        assert with_cents_numpy().tolist() == with_cents_batch()
+        modes.append(('centavos, NumPy int64', with_cents_numpy))
+
+    exact = [Decimal(cents).scaleb(-2) for cents in with_cents_batch()]
+    assert exact == with_decimal()
+    mismatches = sum(Decimal(str(value)) != expected
+                     for value, expected in zip(with_float(), exact))
+
+    print(f'{N_ORDERS:,} pedidos, 5% de desconto, ROUND_HALF_EVEN')
+    print(f'{"modo":<32}{"s":>8}{"pedidos/s":>14}')
+    for name, func in modes:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(f'{name:<32}{elapsed:>8.2f}{N_ORDERS / elapsed:>14,.0f}')
+    print(f'float + round diverge do Decimal em {mismatches:,} pedidos')
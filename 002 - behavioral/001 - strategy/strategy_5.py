@@ -0,0 +1,341 @@
+"""
+Motor de regras para escolher a estratégia de desconto de cada pedido.
+
+Em strategy_1.py quem cria o Order escolhe a estratégia na mão. Aqui as
+regras de preço (PricingRule) dizem qual estratégia vale para um
+segmento de cliente, uma janela de datas [start, end) e uma faixa de
+total [min_total, max_total). Se várias regras servem, vence a de maior
+priority (e, no empate, a que foi adicionada primeiro); se nenhuma
+serve, vale a estratégia padrão.
+
+Olhar todas as regras para cada pedido custa O(regras). O RuleEngine
+indexa as regras:
+    - segmento: dicionário; as regras sem segmento ficam à parte e valem
+      para todos;
+    - datas: árvore de segmentos esparsa sobre os dias. Cada regra fica
+      só nos O(log dias) nós que cobrem a sua janela (uma regra sem data
+      de fim ocupa poucos nós perto da raiz), então a memória é
+      O(regras x log dias);
+    - totais: cada nó guarda as suas regras como faixas elementares de
+      total, com a regra vencedora de cada faixa já calculada.
+
+Uma consulta percorre o caminho da raiz até o dia (O(log dias)) e junta
+as faixas dos nós com regras; o resultado fica num cache por (segmento,
+dia), então as consultas seguintes do mesmo dia são uma busca binária.
+add() só insere a regra nos seus nós e limpa o cache: não há
+reconstrução do índice inteiro.
+
+resolve_batch resolve muitos pedidos de uma vez com o mesmo cache.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+from math import inf
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from strategy_1 import DiscountStrategy, NoDiscount
+
+
+@dataclass(frozen=True)
+class PricingRule:
+    strategy: DiscountStrategy
+    segment: Optional[str] = None  # None: qualquer segmento
+    start: date = date.min
+    end: date = date.max
+    min_total: float = 0
+    max_total: float = inf
+    priority: int = 0
+
+    def matches(self, segment: str, day: date, total: float) -> bool:
+        return ((self.segment is None or self.segment == segment)
+                and self.start <= day < self.end
+                and self.min_total <= total < self.max_total)
+
+
+# Faixas de total: (pontas, vencedora por faixa). Cada vencedora é uma
+# entrada (priority, -ordem, regra), então max() escolhe a melhor regra.
+_Entry = Tuple[int, int, PricingRule]
+_TotalIndex = Tuple[List[float], List[Optional[_Entry]]]
+
+# Todos os dias representáveis, como ordinais [_DAY_MIN, _DAY_MAX)
+_DAY_MIN = date.min.toordinal()
+_DAY_MAX = date.max.toordinal() + 1
+
+
+class _TierTable:
+    """ Regras de um nó da árvore, com a vencedora por faixa de total """
+
+    __slots__ = ('entries', 'bounds', 'winners', 'dirty')
+
+    def __init__(self) -> None:
+        self.entries: List[_Entry] = []
+        self.bounds: List[float] = []
+        self.winners: List[Optional[_Entry]] = [None]
+        self.dirty = False
+
+    def add(self, entry: _Entry) -> None:
+        # Só marca; a tabela é refeita na próxima consulta a este nó
+        self.entries.append(entry)
+        self.dirty = True
+
+    def paint(self) -> None:
+        entries = sorted(self.entries)
+        bounds = sorted({e[2].min_total for e in entries} |
+                        {e[2].max_total for e in entries})
+        winners: List[Optional[_Entry]] = [None] * (len(bounds) + 1)
+        position = {bound: i + 1 for i, bound in enumerate(bounds)}
+        # "Pinta" as faixas da pior para a melhor regra: a última vence
+        for entry in entries:
+            first = position[entry[2].min_total]
+            last = position[entry[2].max_total]
+            winners[first:last] = [entry] * (last - first)
+        self.bounds, self.winners, self.dirty = bounds, winners, False
+
+
+class _DateTree:
+    """
+    Árvore de segmentos esparsa sobre os dias (ordinais de date). Cada
+    regra fica nos O(log dias) nós que cobrem a sua janela, e só os nós
+    usados existem (dicionário índice -> _TierTable).
+    """
+
+    def __init__(self) -> None:
+        self.nodes: Dict[int, _TierTable] = {}
+
+    def insert(self, entry: _Entry, start: int, end: int) -> None:
+        stack = [(1, _DAY_MIN, _DAY_MAX)]
+        while stack:
+            index, low, high = stack.pop()
+            if end <= low or high <= start:
+                continue
+            if start <= low and high <= end:
+                node = self.nodes.get(index)
+                if node is None:
+                    node = self.nodes[index] = _TierTable()
+                node.add(entry)
+                continue
+            middle = (low + high) // 2
+            stack.append((2 * index, low, middle))
+            stack.append((2 * index + 1, middle, high))
+
+    def path(self, day: int) -> List[_TierTable]:
+        """ Nós com regras no caminho da raiz até o dia """
+        nodes = self.nodes
+        tables = []
+        index, low, high = 1, _DAY_MIN, _DAY_MAX
+        while True:
+            node = nodes.get(index)
+            if node is not None:
+                if node.dirty:
+                    node.paint()
+                tables.append(node)
+            if high - low == 1:
+                return tables
+            middle = (low + high) // 2
+            if day < middle:
+                index, high = 2 * index, middle
+            else:
+                index, low = 2 * index + 1, middle
+
+
+def _merge(tables: List[_TierTable]) -> _TotalIndex:
+    """ Junta as tabelas de um caminho numa só, com a melhor por faixa """
+    if not tables:
+        return [], [None]
+    if len(tables) == 1:
+        return tables[0].bounds, tables[0].winners
+
+    bounds = sorted(set().union(*(table.bounds for table in tables)))
+    winners: List[Optional[_Entry]] = []
+    for i in range(len(bounds) + 1):
+        candidates = [
+            table.winners[bisect_right(table.bounds, bounds[i - 1])
+                          if i else 0]
+            for table in tables
+        ]
+        winners.append(max((c for c in candidates if c is not None),
+                           default=None))
+    return bounds, winners
+
+
+class RuleEngine:
+    def __init__(self, rules: Iterable[PricingRule] = (),
+                 default: Optional[DiscountStrategy] = None,
+                 cache_size: int = 100_000) -> None:
+        self.default = default or NoDiscount()
+        self.cache_size = cache_size
+        # Segmento -> árvore de datas; None guarda as regras sem segmento
+        self._trees: Dict[Optional[str], _DateTree] = {None: _DateTree()}
+        self._cache: Dict[Tuple[str, date], _TotalIndex] = {}
+        self._count = 0
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: PricingRule) -> None:
+        assert rule.start < rule.end, 'Janela de datas vazia'
+        assert rule.min_total < rule.max_total, 'Faixa de total vazia'
+        entry = (rule.priority, -self._count, rule)
+        self._count += 1
+        tree = self._trees.get(rule.segment)
+        if tree is None:
+            tree = self._trees[rule.segment] = _DateTree()
+        tree.insert(entry, rule.start.toordinal(), rule.end.toordinal())
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _slot(self, segment: str, day: date) -> _TotalIndex:
+        slot = self._cache.get((segment, day))
+        if slot is None:
+            ordinal = day.toordinal()
+            tables = self._trees[None].path(ordinal)
+            tree = self._trees.get(segment) if segment is not None else None
+            if tree is not None:
+                tables += tree.path(ordinal)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            slot = self._cache[segment, day] = _merge(tables)
+        return slot
+
+    def find_rule(self, segment: str, day: date,
+                  total: float) -> Optional[PricingRule]:
+        bounds, winners = self._slot(segment, day)
+        entry = winners[bisect_right(bounds, total)]
+        return entry[2] if entry is not None else None
+
+    def resolve(self, segment: str, day: date,
+                total: float) -> DiscountStrategy:
+        rule = self.find_rule(segment, day, total)
+        return rule.strategy if rule is not None else self.default
+
+    def resolve_batch(
+        self, orders: Iterable[Tuple[str, date, float]]
+    ) -> List[DiscountStrategy]:
+        """ orders: (segmento, data, total) por pedido """
+        cache = self._cache
+        slot_for = self._slot
+        default = self.default
+        result = []
+        append = result.append
+        for segment, day, total in orders:
+            slot = cache.get((segment, day)) or slot_for(segment, day)
+            entry = slot[1][bisect_right(slot[0], total)]
+            append(entry[2].strategy if entry is not None else default)
+        return result
+
+
+def linear_resolve(rules: List[PricingRule], segment: str, day: date,
+                   total: float,
+                   default: DiscountStrategy) -> DiscountStrategy:
+    """ Sem índice: rules ordenada da melhor para a pior """
+    for rule in rules:
+        if rule.matches(segment, day, total):
+            return rule.strategy
+    return default
+
+
+if __name__ == "__main__":
+    import time
+    from datetime import timedelta
+    from random import choice, randint, random, uniform
+
+    from strategy_1 import CustomDiscount, Order
+
+    N_RULES = 10_000
+    N_ORDERS = 1_000_000
+    N_LINEAR = 2_000
+    N_ADDS = 1_000
+    SEGMENTS = [f'segmento{i}' for i in range(20)]
+    TIERS = [0, 50, 100, 200, 500, 1000, 2000, 5000, inf]
+    YEAR_START = date(2026, 1, 1)
+
+    engine = RuleEngine([
+        PricingRule(CustomDiscount(10), segment='ouro', min_total=100),
+        PricingRule(CustomDiscount(20), segment='ouro',
+                    start=date(2026, 11, 27), end=date(2026, 11, 28),
+                    priority=1),
+        PricingRule(CustomDiscount(5), min_total=1000),
+    ])
+    for segment, day, total in [('ouro', date(2026, 5, 1), 150),
+                                ('ouro', date(2026, 11, 27), 150),
+                                ('prata', date(2026, 5, 1), 1500),
+                                ('prata', date(2026, 5, 1), 50)]:
+        order = Order(total, engine.resolve(segment, day, total))
+        print(segment, day, total, '->', order.total_with_discount)
+    print()
+
+    strategies = [CustomDiscount(percent) for percent in range(1, 51)]
+
+    def random_rule(no_end: bool = False,
+                    wildcard: float = 0.05) -> PricingRule:
+        first = randint(0, len(TIERS) - 2)
+        last = randint(first + 1, len(TIERS) - 1)
+        start = YEAR_START + timedelta(days=randint(0, 364))
+        return PricingRule(
+            choice(strategies),
+            segment=None if random() < wildcard else choice(SEGMENTS),
+            start=start,
+            end=date.max if no_end else start + timedelta(
+                days=randint(7, 90)),
+            min_total=TIERS[first],
+            max_total=TIERS[last],
+            priority=randint(0, 9),
+        )
+
+    orders = [(choice(SEGMENTS + ['sem_regra']),
+               YEAR_START + timedelta(days=randint(0, 364)),
+               round(uniform(1, 6000), 2))
+              for _ in range(N_ORDERS)]
+
+    def bench(title: str, rules: List[PricingRule]) -> None:
+        start = time.perf_counter()
+        engine = RuleEngine(rules)
+        build = time.perf_counter() - start
+
+        best_first = [rule for _, rule in sorted(
+            enumerate(rules), key=lambda item: (-item[1].priority, item[0])
+        )]
+        default = engine.default
+
+        def linear() -> List:
+            return [linear_resolve(best_first, *order, default)
+                    for order in orders[:N_LINEAR]]
+
+        def indexed() -> List:
+            engine._cache.clear()
+            return [engine.resolve(*order) for order in orders]
+
+        def batch() -> List:
+            engine._cache.clear()
+            return engine.resolve_batch(orders)
+
+        assert linear() == indexed()[:N_LINEAR] == batch()[:N_LINEAR]
+
+        # add() com o índice em uso: cada regra nova seguida de consultas
+        start = time.perf_counter()
+        for i in range(N_ADDS):
+            engine.add(random_rule())
+            engine.resolve(*orders[i])
+        adds = (time.perf_counter() - start) / N_ADDS
+
+        print(f'{title}: {len(rules):,} regras, construção {build:.2f} s, '
+              f'add() + consulta {adds * 1e6:.0f} µs')
+        print(f'{"modo":<34}{"pedidos":>10}{"µs/pedido":>12}'
+              f'{"s para 1M":>12}')
+        for name, func, n in [('varredura linear', linear, N_LINEAR),
+                              ('RuleEngine.resolve', indexed, N_ORDERS),
+                              ('RuleEngine.resolve_batch', batch,
+                               N_ORDERS)]:
+            start = time.perf_counter()
+            func()
+            per_order = (time.perf_counter() - start) / n
+            print(f'{name:<34}{n:>10,}{per_order * 1e6:>12.2f}'
+                  f'{per_order * N_ORDERS:>12.1f}')
+        print()
+
+    bench('janelas de 7 a 90 dias', [random_rule() for _ in range(N_RULES)])
+    bench('metade sem data de fim, metade sem segmento', [
+        random_rule(no_end=i % 2 == 0, wildcard=0.5)
+        for i in range(N_RULES)
+    ])
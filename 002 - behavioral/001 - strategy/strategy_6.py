@@ -0,0 +1,197 @@
+"""
+Executor que escolhe o backend mais rápido para cada tamanho de lote.
+
+Para lotes pequenos, o calculate_batch em Python puro (listas) ganha do
+NumPy, que paga para converter a lista em array e de volta; para lotes
+grandes, o NumPy ganha. Com vários núcleos, dividir um lote enorme entre
+processos também pode compensar.
+
+O StrategyExecutor guarda os backends para a mesma estratégia:
+    python: strategy.calculate_batch numa lista;
+    numpy: converte para array, calcula vetorizado e volta para lista
+        (só se o NumPy estiver instalado);
+    processos: divide a lista em pedaços e calcula num pool de processos.
+
+Na criação ele calibra: mede cada backend em lotes de vários tamanhos
+nesta máquina e monta a tabela de calibração. Cada chamada de run usa o
+backend que venceu no maior tamanho medido que não passa do tamanho do
+lote.
+
+Se a estratégia não puder ir para os processos via pickle (por exemplo,
+guarda um lambda), o backend de processos sai dos candidatos já na
+calibração. O executor é um context manager: o with fecha o pool.
+"""
+import os
+import pickle
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from strategy_1 import DiscountStrategy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CALIBRATION_SIZES = [1, 10, 100, 1_000, 10_000, 100_000]
+
+
+def _calculate_chunk(strategy: DiscountStrategy,
+                     totals: List[float]) -> List[float]:
+    # Precisa estar no módulo para ir para os processos via pickle
+    return strategy.calculate_batch(totals)
+
+
+class StrategyExecutor:
+    def __init__(self, strategy: DiscountStrategy,
+                 workers: Optional[int] = None,
+                 calibration_sizes: Sequence[int] = CALIBRATION_SIZES
+                 ) -> None:
+        self.strategy = strategy
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.backends: Dict[str, Callable[[List[float]], List[float]]] = {
+            'python': self._run_python,
+        }
+        if np is not None:
+            self.backends['numpy'] = self._run_numpy
+        self.backends['processos'] = self._run_processes
+
+        # (tamanho, {backend: segundos por lote}) para cada tamanho medido
+        self.calibration: List[Tuple[int, Dict[str, float]]] = []
+        self._sizes: List[int] = []
+        self._winners: List[str] = []
+        self.calibrate(calibration_sizes)
+
+    def _run_python(self, totals: List[float]) -> List[float]:
+        return self.strategy.calculate_batch(totals)
+
+    def _run_numpy(self, totals: List[float]) -> List[float]:
+        return self.strategy.calculate_batch(
+            np.asarray(totals, dtype=float)
+        ).tolist()
+
+    def _run_processes(self, totals: List[float]) -> List[float]:
+        if not totals:
+            # range() com passo 0 levantaria ValueError
+            return []
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        size = -(-len(totals) // self.workers)
+        chunks = [totals[i:i + size] for i in range(0, len(totals), size)]
+        result: List[float] = []
+        for part in self._pool.map(_calculate_chunk,
+                                   [self.strategy] * len(chunks), chunks):
+            result.extend(part)
+        return result
+
+    def calibrate(self, sizes: Sequence[int]) -> None:
+        self.calibration = []
+        for size in sorted(sizes):
+            totals = [float(i % 5000) for i in range(size)]
+            timings = {}
+            for name, backend in list(self.backends.items()):
+                start = time.perf_counter()
+                try:
+                    backend(totals)
+                except (pickle.PicklingError, AttributeError, TypeError):
+                    if name != 'processos':
+                        raise
+                    # A estratégia não vai para os processos via pickle
+                    self._drop_backend(name)
+                    continue
+                best = time.perf_counter() - start
+                # Repete os lotes rápidos até ~10 ms, para a medida não
+                # ser só ruído
+                repeat = min(10_000 // size, int(0.01 / max(best, 1e-9)))
+                for _ in range(2 if repeat > 0 else 0):
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        backend(totals)
+                    best = min(best, (time.perf_counter() - start) / repeat)
+                timings[name] = best
+            self.calibration.append((size, timings))
+
+        self._sizes = [size for size, _ in self.calibration]
+        self._winners = [min(timings, key=timings.get)
+                         for _, timings in self.calibration]
+
+    def _drop_backend(self, name: str) -> None:
+        del self.backends[name]
+        for _, timings in self.calibration:
+            timings.pop(name, None)
+        self.close()
+
+    def backend_for(self, size: int) -> str:
+        index = bisect_right(self._sizes, size) - 1
+        return self._winners[max(index, 0)]
+
+    def run(self, totals: List[float]) -> List[float]:
+        return self.backends[self.backend_for(len(totals))](totals)
+
+    def calibration_table(self) -> str:
+        names = list(self.backends)
+        lines = [f'{"lote":>10}' + ''.join(f'{n:>12}' for n in names)
+                 + f'{"vencedor":>12}   (µs por lote)']
+        for (size, timings), winner in zip(self.calibration, self._winners):
+            lines.append(f'{size:>10,}' + ''.join(
+                f'{timings[n] * 1e6:>12.1f}' for n in names
+            ) + f'{winner:>12}')
+        return '\n'.join(lines)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> 'StrategyExecutor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    from strategy_1 import CustomDiscount
+
+    class LambdaDiscount(DiscountStrategy):
+        def __init__(self) -> None:
+            self._rate = lambda total: total * 0.9
+
+        def calculate(self, total: float) -> float:
+            return self._rate(total)
+
+    SWEEP_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000,
+                   10_000_000]
+
+    # Sem pickle, sem processos: a calibração descarta o backend
+    with StrategyExecutor(LambdaDiscount(), calibration_sizes=[10]) as local:
+        assert 'processos' not in local.backends
+        assert local.run([100.0]) == [90.0]
+
+    start = time.perf_counter()
+    executor = StrategyExecutor(CustomDiscount(5))
+    print(f'calibração em {time.perf_counter() - start:.2f} s, '
+          f'{executor.workers} processo(s), NumPy: '
+          f'{"sim" if np is not None else "não"}')
+    print(executor.calibration_table())
+    print()
+
+    names = list(executor.backends)
+    print('varredura (µs por lote)')
+    print(f'{"lote":>12}' + ''.join(f'{n:>14}' for n in names)
+          + f'{"autotuner":>14}{"escolhido":>12}')
+    for size in SWEEP_SIZES:
+        totals = [float(i % 5000) for i in range(size)]
+        repeat = max(1, 10_000 // size)
+        row = f'{size:>12,}'
+        for func in [*executor.backends.values(), executor.run]:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func(totals)
+            elapsed = (time.perf_counter() - start) / repeat
+            row += f'{elapsed * 1e6:>14,.1f}'
+        print(row + f'{executor.backend_for(size):>12}')
+    executor.close()
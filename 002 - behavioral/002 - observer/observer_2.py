@@ -0,0 +1,197 @@
+"""
+Observers inscritos por chave, notificados só com o que mudou.
+
+O WeatherStation de observer_1.py monta um dicionário novo a cada
+atualização ({**self._state, **state_update}), compara os dicionários
+inteiros e chama update() em todos os observers, mesmo que a chave que
+mudou não interesse a nenhum deles.
+
+O KeyedWeatherStation:
+    - compara só as chaves que vieram na atualização e altera o estado no
+      lugar. Como o dicionário é sempre o mesmo, state devolve uma visão
+      somente leitura dele (MappingProxyType) e o diff entregue a vários
+      observers também é somente leitura: nenhum observer altera o que
+      os outros recebem;
+    - guarda uma versão por chave, que aumenta a cada mudança;
+    - notifica só os observers inscritos nas chaves que mudaram, com o
+      dicionário das mudanças (só as chaves que cada um assinou).
+
+Observers inscritos com subscribe implementam IKeyObserver. Os observers
+antigos (add_observer) continuam recebendo update() a cada mudança.
+Chaves apagadas por reset_state chegam com o valor REMOVED.
+"""
+from abc import abstractmethod
+from types import MappingProxyType
+from typing import Dict, Hashable, Iterable, List, Mapping
+
+from observer_1 import IObserver, WeatherStation
+
+
+class _Removed:
+    def __repr__(self) -> str:
+        return 'REMOVED'
+
+
+REMOVED = _Removed()
+_MISSING = object()
+
+
+class IKeyObserver(IObserver):
+    @abstractmethod
+    def update_changes(self, changes: Mapping) -> None: pass
+
+    def update(self) -> None:
+        pass
+
+
+class KeyedWeatherStation(WeatherStation):
+    def __init__(self) -> None:
+        super().__init__()
+        self._versions: Dict[Hashable, int] = {}
+        self._subscribers: Dict[Hashable, List[IKeyObserver]] = {}
+
+    @property
+    def state(self) -> Mapping:
+        return MappingProxyType(self._state)
+
+    @state.setter
+    def state(self, state_update: Dict) -> None:
+        current = self._state
+        changes = {
+            key: value for key, value in state_update.items()
+            if current.get(key, _MISSING) != value
+        }
+        if changes:
+            current.update(changes)
+            self._changed(changes)
+
+    def reset_state(self) -> None:
+        changes = dict.fromkeys(self._state, REMOVED)
+        self._state.clear()
+        self._changed(changes)
+
+    def version(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def subscribe(self, observer: IKeyObserver,
+                  keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            subscribers = self._subscribers.setdefault(key, [])
+            if observer not in subscribers:
+                subscribers.append(observer)
+
+    def unsubscribe(self, observer: IKeyObserver,
+                    keys: Iterable[Hashable]) -> None:
+        for key in keys:
+            subscribers = self._subscribers.get(key, [])
+            if observer in subscribers:
+                subscribers.remove(observer)
+
+    def _changed(self, changes: Dict) -> None:
+        versions = self._versions
+        for key in changes:
+            versions[key] = versions.get(key, 0) + 1
+
+        if self._observers:
+            self.notify_observers()
+        if len(changes) == 1:
+            # Caso mais comum: uma chave, o mesmo diff para todos
+            shared = MappingProxyType(changes)
+            for key in changes:
+                for observer in self._subscribers.get(key, ()):
+                    observer.update_changes(shared)
+            return
+
+        # Várias chaves: cada observer recebe só as que assinou, uma vez
+        pending: Dict[IKeyObserver, Dict] = {}
+        for key, value in changes.items():
+            for observer in self._subscribers.get(key, ()):
+                diff = pending.get(observer)
+                if diff is None:
+                    diff = pending[observer] = {}
+                diff[key] = value
+        for observer, diff in pending.items():
+            observer.update_changes(diff)
+
+
+class Display(IKeyObserver):
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def update_changes(self, changes: Mapping) -> None:
+        print(f'{self._name} recebeu:', changes)
+
+
+if __name__ == "__main__":
+    import time
+    from random import randrange, sample
+
+    from observer_1 import Notebook
+
+    N_OBSERVERS = 10_000
+    N_KEYS = 1_000
+    KEYS_PER_OBSERVER = 5
+    N_UPDATES = 20_000
+
+    weather_station = KeyedWeatherStation()
+    termometro = Display('Termômetro')
+    higrometro = Display('Higrômetro')
+    weather_station.subscribe(termometro, ['temperature'])
+    weather_station.subscribe(higrometro, ['humidity'])
+    weather_station.add_observer(Notebook(weather_station))
+
+    weather_station.state = {'temperature': 30}
+    weather_station.state = {'temperature': 30}
+    weather_station.state = {'temperature': 40, 'humidity': 90}
+    print('versão de temperature:', weather_station.version('temperature'))
+    try:
+        weather_station.state['temperature'] = 0
+    except TypeError:
+        pass
+    assert weather_station.state['temperature'] == 40
+    weather_station.reset_state()
+    print()
+
+    class Counter(IObserver):
+        calls = 0
+
+        def update(self) -> None:
+            Counter.calls += 1
+
+    class KeyCounter(IKeyObserver):
+        calls = 0
+
+        def update_changes(self, changes: Mapping) -> None:
+            KeyCounter.calls += 1
+
+    keys = [f'sensor{i}' for i in range(N_KEYS)]
+    updates = [{keys[randrange(N_KEYS)]: i} for i in range(N_UPDATES)]
+
+    old_station = WeatherStation()
+    for _ in range(N_OBSERVERS):
+        old_station.add_observer(Counter())
+
+    keyed_station = KeyedWeatherStation()
+    for _ in range(N_OBSERVERS):
+        keyed_station.subscribe(KeyCounter(),
+                                sample(keys, KEYS_PER_OBSERVER))
+
+    def run(station, updates: List[Dict]):
+        start = time.perf_counter()
+        for update in updates:
+            station.state = update
+        return time.perf_counter() - start
+
+    print(f'{N_OBSERVERS:,} observers, {N_KEYS:,} chaves, '
+          f'{KEYS_PER_OBSERVER} chaves por observer, 1 chave por '
+          'atualização')
+    print(f'{"estação":<24}{"atualizações":>14}{"atualiz./s":>12}'
+          f'{"notificações/atualiz.":>24}')
+    for name, station, counter, n in [
+        ('WeatherStation', old_station, Counter, N_UPDATES // 20),
+        ('KeyedWeatherStation', keyed_station, KeyCounter, N_UPDATES),
+    ]:
+        counter.calls = 0
+        elapsed = run(station, updates[:n])
+        print(f'{name:<24}{n:>14,}{n / elapsed:>12,.0f}'
+              f'{counter.calls / n:>24,.1f}')
@@ -0,0 +1,384 @@
+"""
+Notificação assíncrona e concorrente dos observers, com timeout.
+
+Em observer_1.py o notify_observers chama o update() de cada observer,
+um depois do outro, na thread de quem alterou o estado. Um Smartphone
+lento segura o sensor que está produzindo os dados.
+
+No AsyncWeatherStation a notificação é uma rodada asyncio.gather:
+    - observers com "async def update" rodam concorrentemente no loop;
+    - observers bloqueantes (add_observer(..., blocking=True)) rodam num
+      pool de threads;
+    - os outros observers síncronos são chamados direto e precisam ser
+      rápidos.
+
+Cada observer tem um timeout (o padrão da estação ou o informado no
+add_observer). Um observer que demora demais ou que levanta uma exceção
+não atrapalha os outros: o erro fica em last_failures. Uma thread que
+passou do timeout não pode ser interrompida; ela termina sozinha no pool.
+Enquanto ela não termina, aquele observer bloqueante é pulado (falha com
+TimeoutError). Assim cada observer bloqueante ocupa no máximo uma thread,
+e o pool cresce para ter pelo menos uma thread por observer bloqueante:
+um observer travado não deixa os outros sem thread.
+
+As rodadas são feitas uma de cada vez, na ordem das alterações: cada uma
+devolve as suas próprias falhas, e last_failures é sempre a da última
+rodada que terminou. Cada rodada recebe o estado do momento da alteração:
+durante a rodada, state devolve esse estado aos observers, mesmo que
+outras alterações já tenham sido feitas (via contextvars, que também
+chegam às threads dos observers bloqueantes).
+
+Dentro de um loop rodando, alterar state agenda a notificação e volta na
+hora (drain() espera as notificações pendentes); set_state faz o mesmo e
+espera a rodada terminar. Fora de um loop, state roda a rodada num event
+loop da própria estação, criado uma vez e reaproveitado (asyncio.run
+criaria e fecharia um loop a cada atribuição).
+"""
+import asyncio
+import contextvars
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from observer_1 import IObserver, WeatherStation
+
+Failures = List[Tuple[IObserver, BaseException]]
+
+# (estação, estado) da rodada em andamento no contexto atual
+_round_state: contextvars.ContextVar = contextvars.ContextVar(
+    'round_state', default=None
+)
+
+
+class AsyncWeatherStation(WeatherStation):
+    def __init__(self, timeout: float = 1.0, max_workers: int = 8) -> None:
+        super().__init__()
+        self.timeout = timeout
+        self.last_failures: Failures = []
+        self._timeouts: Dict[IObserver, float] = {}
+        self._blocking: Set[IObserver] = set()
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._pending: Set[asyncio.Task] = set()
+        # Observers bloqueantes com update ainda rodando numa thread
+        self._running: Set[IObserver] = set()
+        # A trava das rodadas é do loop em que foi criada
+        self._round_lock: Optional[asyncio.Lock] = None
+        self._round_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Loop das rodadas disparadas fora de um loop
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_lock = threading.Lock()
+
+    @WeatherStation.state.getter
+    def state(self) -> Dict:
+        current = _round_state.get()
+        if current is not None and current[0] is self:
+            return current[1]
+        return self._state
+
+    def add_observer(self, observer: IObserver,
+                     timeout: Optional[float] = None,
+                     blocking: bool = False) -> None:
+        super().add_observer(observer)
+        if timeout is not None:
+            self._timeouts[observer] = timeout
+        if blocking:
+            self._blocking.add(observer)
+            if len(self._blocking) > self._max_workers:
+                # As threads do pool antigo terminam sozinhas
+                self._max_workers = len(self._blocking)
+                old, self._executor = (self._executor,
+                                       ThreadPoolExecutor(self._max_workers))
+                old.shutdown(wait=False)
+
+    def remove_observer(self, observer: IObserver) -> None:
+        super().remove_observer(observer)
+        self._timeouts.pop(observer, None)
+        self._blocking.discard(observer)
+
+    async def _notify(self, observer: IObserver) -> None:
+        timeout = self._timeouts.get(observer, self.timeout)
+        if inspect.iscoroutinefunction(observer.update):
+            await asyncio.wait_for(observer.update(), timeout)
+        elif observer in self._blocking:
+            if observer in self._running:
+                raise TimeoutError('update anterior ainda rodando')
+            self._running.add(observer)
+            future = self._executor.submit(
+                contextvars.copy_context().run, observer.update
+            )
+            # Só sai de _running quando a thread termina de verdade, e não
+            # quando o wait_for desiste de esperar
+            future.add_done_callback(
+                lambda _: self._running.discard(observer)
+            )
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        else:
+            observer.update()
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._round_loop is not loop:
+            self._round_loop = loop
+            self._round_lock = asyncio.Lock()
+        return self._round_lock
+
+    async def notify_observers_async(self, state: Optional[Dict] = None
+                                     ) -> Failures:
+        """ state: o estado que a rodada mostra (padrão: o atual) """
+        state = self._state if state is None else state
+        async with self._lock():
+            observers = list(self._observers)
+            # As tasks do gather copiam o contexto com este estado
+            token = _round_state.set((self, state))
+            try:
+                results = await asyncio.gather(
+                    *[self._notify(observer) for observer in observers],
+                    return_exceptions=True,
+                )
+            finally:
+                _round_state.reset(token)
+            failures = [
+                (observer, result)
+                for observer, result in zip(observers, results)
+                if isinstance(result, BaseException)
+            ]
+            self.last_failures = failures
+            return failures
+
+    def notify_observers(self) -> None:
+        # O estado desta alteração, e não o de quando a rodada rodar
+        state = self._state
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            with self._sync_lock:
+                if self._sync_loop is None:
+                    self._sync_loop = asyncio.new_event_loop()
+                self._sync_loop.run_until_complete(
+                    self.notify_observers_async(state)
+                )
+            return
+
+        # Dentro do loop: agenda e volta para quem alterou o estado
+        task = loop.create_task(self.notify_observers_async(state))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def set_state(self, state_update: Dict) -> Failures:
+        new_state = {**self._state, **state_update}
+        if new_state == self._state:
+            return []
+        self._state = new_state
+        return await self.notify_observers_async()
+
+    async def drain(self) -> None:
+        while self._pending:
+            await asyncio.gather(*self._pending)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        with self._sync_lock:
+            if self._sync_loop is not None:
+                self._sync_loop.close()
+                self._sync_loop = None
+
+
+class AsyncSmartphone(IObserver):
+    def __init__(self, name, observable: WeatherStation,
+                 delay: float = 0) -> None:
+        self._name = name
+        self._observable = observable
+        self._delay = delay
+
+    async def update(self) -> None:
+        await asyncio.sleep(self._delay)
+        print(f'{self._name} atualizado:', self._observable.state)
+
+
+if __name__ == "__main__":
+    import time
+
+    from observer_1 import Notebook, Smartphone
+
+    N_UPDATES = 20
+    N_FAST = 100
+    N_SLOW = 10
+    N_BLOCKING = 5
+    SLOW_DELAY = 0.05
+    HANG_DELAY = 2.0
+    TIMEOUT = 0.2
+
+    class SlowSmartphone(Smartphone):
+        def update(self) -> None:
+            time.sleep(SLOW_DELAY)
+            super().update()
+
+    class HangingSmartphone(Smartphone):
+        def update(self) -> None:
+            time.sleep(HANG_DELAY)
+
+    class BrokenNotebook(Notebook):
+        def update(self) -> None:
+            raise RuntimeError('tela quebrada')
+
+    class Recorder(IObserver):
+        def __init__(self, station, seen: List[int]) -> None:
+            self.station = station
+            self.seen = seen
+
+        def update(self) -> None:
+            self.seen.append(self.station.state['temperature'])
+
+    async def demo() -> None:
+        station = AsyncWeatherStation(timeout=TIMEOUT)
+        station.add_observer(AsyncSmartphone('Smartphone rápido', station))
+        station.add_observer(AsyncSmartphone('Smartphone travado', station,
+                                             delay=HANG_DELAY))
+        station.add_observer(SlowSmartphone('Smartphone lento', station),
+                             blocking=True)
+        station.add_observer(BrokenNotebook(station))
+
+        start = time.perf_counter()
+        station.state = {'temperature': 30}
+        print(f'state voltou em {(time.perf_counter() - start) * 1e3:.2f} ms')
+        await station.drain()
+        print(f'rodada terminou em '
+              f'{(time.perf_counter() - start) * 1e3:.0f} ms')
+        for observer, error in station.last_failures:
+            print(' falhou:', type(observer).__name__, repr(error))
+
+        # Observer bloqueante travado: na rodada seguinte ele é pulado, em
+        # vez de prender mais uma thread, e o lento continua com a sua
+        station = AsyncWeatherStation(timeout=TIMEOUT, max_workers=1)
+        station.add_observer(HangingSmartphone('Smartphone travado',
+                                               station), blocking=True)
+        station.add_observer(SlowSmartphone('Smartphone lento', station),
+                             blocking=True)
+        for temperature in (31, 32):
+            failures = await station.set_state({'temperature': temperature})
+            for observer, error in failures:
+                print(' falhou:', observer._name, repr(error))
+        station.close()
+
+        # Três alterações antes de qualquer rodada: cada rodada mostra o
+        # seu estado, também para o observer bloqueante
+        seen: List[int] = []
+        station = AsyncWeatherStation()
+        station.add_observer(Recorder(station, seen))
+        station.add_observer(Recorder(station, seen), blocking=True)
+        for temperature in (1, 2, 3):
+            station.state = {'temperature': temperature}
+        await station.drain()
+        assert seen == [1, 1, 2, 2, 3, 3], seen
+        station.close()
+
+    asyncio.run(demo())
+
+    # Fora de um loop: um único event loop para todas as rodadas
+    seen: List[int] = []
+    station = AsyncWeatherStation()
+    station.add_observer(Recorder(station, seen))
+    station.state = {'temperature': 1}
+    loop = station._sync_loop
+    station.state = {'temperature': 2}
+    assert station._sync_loop is loop and seen == [1, 2]
+    station.close()
+    print()
+
+    # Benchmark: observers que só medem a latência
+    published: Dict[int, float] = {}
+    latencies: Dict[str, List[float]] = {}
+
+    def record(kind: str, station: WeatherStation) -> None:
+        seq = station.state['seq']
+        latencies.setdefault(kind, []).append(
+            time.perf_counter() - published[seq]
+        )
+
+    class FastObserver(IObserver):
+        def __init__(self, station) -> None:
+            self.station = station
+
+        def update(self) -> None:
+            record('rápido', self.station)
+
+    class AsyncFastObserver(FastObserver):
+        async def update(self) -> None:
+            record('rápido', self.station)
+
+    class SlowObserver(FastObserver):
+        def update(self) -> None:
+            time.sleep(SLOW_DELAY)
+            record('lento', self.station)
+
+    class AsyncSlowObserver(FastObserver):
+        async def update(self) -> None:
+            await asyncio.sleep(SLOW_DELAY)
+            record('lento', self.station)
+
+    class HangingObserver(FastObserver):
+        def update(self) -> None:
+            time.sleep(HANG_DELAY)
+
+    class AsyncHangingObserver(FastObserver):
+        async def update(self) -> None:
+            await asyncio.sleep(HANG_DELAY)
+
+    def summary(name: str, producer: List[float], rounds: List[float]):
+        def p50(values: List[float]) -> float:
+            return sorted(values)[len(values) // 2] * 1e3 if values else 0
+
+        print(f'{name:<26}{p50(producer):>12.2f}'
+              f'{p50(latencies.get("rápido", [])):>12.2f}'
+              f'{p50(latencies.get("lento", [])):>12.2f}'
+              f'{p50(rounds):>12.1f}')
+
+    print(f'{N_FAST} rápidos, {N_SLOW + N_BLOCKING} lentos '
+          f'({SLOW_DELAY * 1e3:.0f} ms), 1 travado '
+          f'({HANG_DELAY:.0f} s, timeout {TIMEOUT} s); p50 em ms')
+    print(f'{"modo":<26}{"produtor":>12}{"rápidos":>12}{"lentos":>12}'
+          f'{"rodada":>12}')
+
+    station = WeatherStation()
+    for _ in range(N_FAST // 2):
+        station.add_observer(FastObserver(station))
+    for _ in range(N_SLOW + N_BLOCKING):
+        station.add_observer(SlowObserver(station))
+    station.add_observer(HangingObserver(station))
+    for _ in range(N_FAST // 2):
+        station.add_observer(FastObserver(station))
+
+    producer: List[float] = []
+    for seq in range(2):
+        published[seq] = start = time.perf_counter()
+        station.state = {'seq': seq}
+        producer.append(time.perf_counter() - start)
+    summary('sequencial (observer_1)', producer, producer)
+
+    async def concurrent() -> None:
+        station = AsyncWeatherStation(timeout=TIMEOUT)
+        for _ in range(N_FAST // 2):
+            station.add_observer(AsyncFastObserver(station))
+        for _ in range(N_SLOW):
+            station.add_observer(AsyncSlowObserver(station))
+        for _ in range(N_BLOCKING):
+            station.add_observer(SlowObserver(station), blocking=True)
+        station.add_observer(AsyncHangingObserver(station))
+        for _ in range(N_FAST // 2):
+            station.add_observer(FastObserver(station))
+
+        producer, rounds = [], []
+        for seq in range(N_UPDATES):
+            published[seq] = start = time.perf_counter()
+            station.state = {'seq': seq}
+            producer.append(time.perf_counter() - start)
+            await station.drain()
+            rounds.append(time.perf_counter() - start)
+            assert len(station.last_failures) == 1
+        summary('asyncio.gather + threads', producer, rounds)
+        station.close()
+
+    latencies.clear()
+    asyncio.run(concurrent())
@@ -0,0 +1,270 @@
+"""
+Agrupamento (coalescing) e debounce de atualizações do WeatherStation.
+
+Em observer_1.py cada atribuição a state dispara uma rodada completa de
+notificações. Com sensores mandando centenas de atualizações por
+segundo, os observers passam o tempo todo redesenhando estados que já
+ficaram velhos.
+
+O CoalescingWeatherStation junta as atualizações de uma janela e, ao
+final dela, notifica uma única vez com o resultado líquido (se o valor
+voltou ao que era, ninguém é notificado). A janela pode ser:
+    window: tempo, em segundos, contado da primeira atualização pendente;
+    debounce=True: o tempo é contado da última atualização (a janela se
+        estende enquanto chegam atualizações);
+    max_updates: quantidade de atualizações;
+    max_latency: limite de tempo desde a primeira atualização pendente,
+        para o debounce não segurar as notificações para sempre. Com
+        debounce ou só com max_updates, o padrão é MAX_LATENCY: sem ele,
+        atualizações que não completam a contagem ficariam paradas.
+
+flush() notifica na hora o que estiver pendente. As janelas de tempo
+terminam numa thread da própria estação, então os observers podem ser
+chamados nessa thread; close() encerra a thread e faz o último flush.
+Um observer pode alterar state durante a notificação: a atualização fica
+pendente e é notificada numa nova rodada assim que a atual termina.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from observer_1 import WeatherStation
+
+MAX_LATENCY = 1.0
+
+
+class CoalescingWeatherStation(WeatherStation):
+    def __init__(self, window: Optional[float] = None,
+                 max_updates: Optional[int] = None,
+                 max_latency: Optional[float] = None,
+                 debounce: bool = False) -> None:
+        assert window or max_updates, 'Informe window ou max_updates'
+        assert not debounce or window, 'debounce precisa de window'
+        if max_latency is None and (debounce or not window):
+            max_latency = MAX_LATENCY
+        super().__init__()
+        self.window = window
+        self.max_updates = max_updates
+        self.max_latency = max_latency
+        self.debounce = debounce
+        self.notifications = 0
+        self._pending: Dict = {}
+        self._count = 0
+        self._first_at: Optional[float] = None
+        self._last_at: Optional[float] = None
+        self._lock = threading.Condition()
+        # RLock: um observer pode chamar flush (via state) durante a
+        # notificação, na mesma thread
+        self._flush_lock = threading.RLock()
+        self._flushing = False
+        self._closed = False
+        self._timer: Optional[threading.Thread] = None
+        if window or max_latency:
+            self._timer = threading.Thread(target=self._run, daemon=True)
+            self._timer.start()
+
+    @property
+    def state(self) -> Dict:
+        return self._state
+
+    @state.setter
+    def state(self, state_update: Dict) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._pending.update(state_update)
+            self._count += 1
+            self._last_at = now
+            if self._first_at is None:
+                # Janela nova: a thread precisa saber do novo prazo
+                self._first_at = now
+                self._lock.notify()
+            due = bool(self.max_updates) and self._count >= self.max_updates
+        if due:
+            self.flush()
+
+    def _deadline(self) -> Optional[float]:
+        if self._first_at is None:
+            return None
+        deadlines = []
+        if self.window:
+            start = self._last_at if self.debounce else self._first_at
+            deadlines.append(start + self.window)
+        if self.max_latency:
+            deadlines.append(self._first_at + self.max_latency)
+        return min(deadlines) if deadlines else None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed:
+                    deadline = self._deadline()
+                    timeout = (None if deadline is None
+                               else deadline - time.monotonic())
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._lock.wait(timeout)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self) -> bool:
+        """ Notifica o que está pendente; True se o estado mudou """
+        with self._flush_lock:
+            if self._flushing:
+                # Chamado de dentro de uma notificação: a rodada que está
+                # em andamento notifica o que ficou pendente ao terminar
+                return False
+            self._flushing = True
+            try:
+                changed = False
+                while self._flush_pending():
+                    changed = True
+                return changed
+            finally:
+                self._flushing = False
+
+    def _flush_pending(self) -> bool:
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._count = 0
+                self._first_at = self._last_at = None
+            if not pending:
+                return False
+
+            new_state = {**self._state, **pending}
+            if new_state == self._state:
+                return False
+            self._state = new_state
+            self.notifications += 1
+            self.notify_observers()
+            return True
+
+    def reset_state(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                self._pending = {}
+                self._count = 0
+                self._first_at = self._last_at = None
+            super().reset_state()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+        if self._timer is not None:
+            self._timer.join()
+        self.flush()
+
+
+if __name__ == "__main__":
+    import json
+    from bisect import bisect_left
+    from typing import List, Tuple
+
+    from observer_1 import IObserver, Smartphone
+
+    RATE = 1_000
+    DURATION = 2.0
+    N_OBSERVERS = 50
+    N_SENSORS = 10
+
+    station = CoalescingWeatherStation(window=0.05)
+    station.add_observer(Smartphone('Smartphone 1', station))
+    for temperature in range(20, 31):
+        station.state = {'temperature': temperature}
+    station.state = {'humidity': 90}
+    time.sleep(0.1)
+    station.state = {'humidity': 80}
+    station.state = {'humidity': 90}
+    print('voltou ao mesmo valor, flush notificou?', station.flush())
+    station.close()
+
+    # Só contagem: o que não completa as 100 atualizações sai em até
+    # max_latency
+    station = CoalescingWeatherStation(max_updates=100, max_latency=0.05)
+    station.add_observer(Smartphone('Smartphone 2', station))
+    station.state = {'temperature': 19}
+    time.sleep(0.1)
+    print('notificou antes do close?', station.notifications == 1)
+    station.close()
+
+    class Corrector(IObserver):
+        """ Corrige o estado de dentro da notificação (reentrante) """
+
+        def __init__(self, station) -> None:
+            self.station = station
+
+        def update(self) -> None:
+            if self.station.state.get('temperature', 0) > 40:
+                self.station.state = {'temperature': 40}
+
+    station = CoalescingWeatherStation(max_updates=1)
+    station.add_observer(Corrector(station))
+    station.state = {'temperature': 45}
+    assert station.state['temperature'] == 40
+    assert station.notifications == 2
+    station.close()
+    print()
+
+    class Renderer(IObserver):
+        """ Simula um observer que redesenha a tela com o estado """
+
+        def __init__(self, station, seen: List[Tuple[float, int]]) -> None:
+            self.station = station
+            self.seen = seen
+
+        def update(self) -> None:
+            state = self.station.state
+            json.dumps(state)
+            self.seen.append((time.perf_counter(), state['seq']))
+
+    def run(station: WeatherStation):
+        seen: List[Tuple[float, int]] = []
+        for _ in range(N_OBSERVERS):
+            station.add_observer(Renderer(station, seen))
+
+        sent: List[float] = []
+        n_updates = int(RATE * DURATION)
+        cpu_start = time.process_time()
+        start = next_tick = time.perf_counter()
+        for seq in range(n_updates):
+            sent.append(time.perf_counter())
+            station.state = {f'sensor{seq % N_SENSORS}': seq, 'seq': seq}
+            next_tick += 1 / RATE
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if isinstance(station, CoalescingWeatherStation):
+            station.close()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+
+        # Latência: da atualização até a 1ª notificação que a inclui
+        notified = sorted({(seq, moment) for moment, seq in seen})
+        seqs = [seq for seq, _ in notified]
+        latencies = []
+        for seq, moment in enumerate(sent):
+            index = bisect_left(seqs, seq)
+            latencies.append(notified[index][1] - moment)
+        notifications = len(seen) // N_OBSERVERS
+        return n_updates, notifications, cpu, elapsed, max(latencies)
+
+    print(f'{RATE:,} atualizações/s por {DURATION:.0f} s, '
+          f'{N_OBSERVERS} observers')
+    print(f'{"modo":<34}{"notificações":>14}{"CPU (s)":>10}{"CPU %":>8}'
+          f'{"latência máx (ms)":>19}')
+    for name, factory in [
+        ('sem agrupar (observer_1)', WeatherStation),
+        ('janela de 50 ms',
+         lambda: CoalescingWeatherStation(window=0.05)),
+        ('a cada 100 atualizações',
+         lambda: CoalescingWeatherStation(max_updates=100)),
+        ('debounce 20 ms, máx 100 ms',
+         lambda: CoalescingWeatherStation(window=0.02, debounce=True,
+                                          max_latency=0.1)),
+    ]:
+        n_updates, notifications, cpu, elapsed, latency = run(factory())
+        print(f'{name:<34}{notifications:>14,}{cpu:>10.2f}'
+              f'{cpu / elapsed * 100:>8.0f}{latency * 1e3:>19.1f}')